@@ -2,6 +2,47 @@ import json
 import os
 import socket
 
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the standard library
+    orjson = None
+
+CONFIG_FILE = "chat_config.json"
+DEFAULT_CONFIG = {
+    "port": 50000,  # Default port
+    "message_fetch_limit": 5  # Default message fetch limit
+}
+
+
+def _loads(data):
+    """Parses a JSON document from bytes or str, using `orjson` when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _dumps(obj):
+    """Serializes `obj` to an indented JSON string, using `orjson` when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+    return json.dumps(obj, indent=2)
+
+
+def _normalize(config):
+    """Fills in missing defaults and coerces numeric settings once at load time.
+
+    Args:
+        config (dict): Raw configuration as read from disk.
+
+    Returns:
+        dict: Configuration with every default key present and integer settings as `int`.
+    """
+    normalized = {**DEFAULT_CONFIG, **config}
+    for key in ("port", "message_fetch_limit"):
+        normalized[key] = int(normalized[key])
+    return normalized
+
+
 class Config:
     """Handles configuration settings for the chat application.
 
@@ -15,11 +56,8 @@ class Config:
     
     def __init__(self):
         """Initializes the Config class, loads configuration, and ensures a valid configuration file."""
-        self.config_file = "chat_config.json"
-        self.default_config = {
-            "port": 50000,  # Default port
-            "message_fetch_limit": 5  # Default message fetch limit
-        }
+        self.config_file = CONFIG_FILE
+        self.default_config = dict(DEFAULT_CONFIG)
         self.load_config()
 
     def load_config(self):
@@ -31,8 +69,8 @@ class Config:
         """
         if os.path.exists(self.config_file):
             try:
-                with open(self.config_file, 'r') as f:
-                    self.config = json.load(f)
+                with open(self.config_file, 'rb') as f:
+                    self.config = _normalize(_loads(f.read()))
             except IOError as e:
                 raise IOError(f"Error reading config file: {e}")
         else:
@@ -52,9 +90,14 @@ class Config:
         Raises:
             IOError: If there is an issue writing to the file.
         """
+        # Serialize before touching the file, and swap the new file into place,
+        # so a failed save never leaves a truncated config behind
+        data = _dumps(self.config)
+        tmp_file = f"{self.config_file}.tmp"
         try:
-            with open(self.config_file, 'w') as f:
-                json.dump(self.config, f, indent=4)
+            with open(tmp_file, 'w') as f:
+                f.write(data)
+            os.replace(tmp_file, self.config_file)
         except IOError as e:
             raise IOError(f"Error writing config file: {e}")
 
@@ -51,6 +51,8 @@ class ChatClient:
             messagebox.showerror("Error", "Could not connect to server")
             self.root.destroy()
             return
+        # Commands are small and interactive; don't let Nagle hold them back
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
             
         self.username = None
         self.setup_gui()
@@ -252,7 +254,7 @@ class ChatClient:
         )
         
         try:
-            self.socket.send(message)
+            self.socket.sendall(message)
         except Exception as e:
             messagebox.showerror("Error", f"Failed to send create account request: {e}")
             self.on_connection_lost()
@@ -273,7 +275,7 @@ class ChatClient:
         )
         
         try:
-            self.socket.send(message)
+            self.socket.sendall(message)
         except Exception as e:
             messagebox.showerror("Error", f"Failed to send login request: {e}")
             self.on_connection_lost()
@@ -298,7 +300,7 @@ class ChatClient:
         )
         
         try:
-            self.socket.send(message_payload)
+            self.socket.sendall(message_payload)
             self.message_text.delete("1.0", tk.END)
         except Exception as e:
             messagebox.showerror("Error", f"Failed to send message: {e}")
@@ -317,7 +319,7 @@ class ChatClient:
         )
         
         try:
-            self.socket.send(message)
+            self.socket.sendall(message)
         except Exception as e:
             messagebox.showerror("Error", f"Failed to search accounts: {e}")
             self.on_connection_lost()
@@ -338,7 +340,7 @@ class ChatClient:
                 )
                 
                 try:
-                    self.socket.send(message)
+                    self.socket.sendall(message)
                     # Remove the message frames immediately
                     for widget in self.messages_frame.winfo_children():
                         if isinstance(widget, MessageFrame) and widget.message_id in selected_ids:
@@ -367,7 +369,7 @@ class ChatClient:
             )
             
             try:
-                self.socket.send(message)
+                self.socket.sendall(message)
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to delete account: {e}")
                 self.on_connection_lost()
@@ -382,7 +384,7 @@ class ChatClient:
             )
             
             try:
-                self.socket.send(message)
+                self.socket.sendall(message)
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to logout: {e}")
                 self.on_connection_lost()
@@ -401,7 +403,7 @@ class ChatClient:
         )
         
         try:
-            self.socket.send(message)
+            self.socket.sendall(message)
         except Exception as e:
             messagebox.showerror("Error", f"Failed to get messages: {e}")
             self.on_connection_lost()
@@ -420,35 +422,39 @@ class ChatClient:
         )
         
         try:
-            self.socket.send(message)
+            self.socket.sendall(message)
         except Exception as e:
             messagebox.showerror("Error", f"Failed to get unread messages: {e}")
             self.on_connection_lost()
 
     def receive_messages(self):
         """Continuously receives and processes messages from the server."""
-        buffer = b''
+        buffer = bytearray()
+        # Reads land in one reused chunk; complete frames are cut from the front of `buffer`
+        chunk = bytearray(4096)
+        view = memoryview(chunk)
         while self.running:
             try:
-                chunk = self.socket.recv(4096)
-                if not chunk:
-                    self.on_connection_lost()
+                n = self.socket.recv_into(chunk)
+                if not n:
+                    # Runs on the receive thread; Tk widgets may only be touched from mainloop
+                    self.root.after(0, self.on_connection_lost)
                     break
                     
-                buffer += chunk
+                buffer += view[:n]
                 
                 # Process complete messages
-                while len(buffer) >= 6:
-                    # Peek at message length
-                    total_length = struct.unpack('!I', buffer[4:8])[0]
+                while len(buffer) >= CustomWireProtocol.HEADER_SIZE:
+                    # Peek at message length (needs the whole fixed header)
+                    total_length = struct.unpack_from('!I', buffer, 4)[0]
                     
                     # Check if we have a complete message
                     if len(buffer) < total_length:
                         break
                     
                     # Extract full message
-                    message_data = buffer[:total_length]
-                    buffer = buffer[total_length:]
+                    message_data = bytes(buffer[:total_length])
+                    del buffer[:total_length]
                     
                     # Decode message
                     _, _, cmd, _, payload = self.protocol.decode_message(message_data)
@@ -493,19 +499,15 @@ class ChatClient:
                     messagebox.showinfo("Account Created", "Account created successfully! Please log in to continue.")
                 
                 elif cmd == CustomWireProtocol.CMD_LIST:
-                    # Decode list of users
-                    users = []
-                    while remaining_payload:
-                        # Decode username
-                        username, remaining_payload = self.protocol.decode_string(remaining_payload)
-                        # Decode status 
-                        status, remaining_payload = self.protocol.decode_string(remaining_payload)
-                        users.append({"username": username, "status": status})
+                    # Decode list of users: alternating username and status strings
+                    fields = self.protocol.iter_strings(remaining_payload)
+                    users = [{"username": username, "status": status} for username, status in zip(fields, fields)]
                     
                     # Update accounts list
                     self.accounts_list.delete(*self.accounts_list.get_children())
+                    insert_row = self.accounts_list.insert
                     for user in users:
-                        self.accounts_list.insert("", "end", values=(user["username"], user["status"]))
+                        insert_row("", "end", iid=user["username"], values=(user["username"], user["status"]))
                     
                     # Update both total and online user counts
                     total_users = len(users)
@@ -604,7 +606,7 @@ class ChatClient:
                     CustomWireProtocol.CMD_LOGOUT, 
                     []
                 )
-                self.socket.send(message)
+                self.socket.sendall(message)
             except:
                 pass
         try:
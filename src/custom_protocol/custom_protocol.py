@@ -1,5 +1,12 @@
 import struct
 
+# Precompiled formats so encode/decode don't re-parse format strings per call
+_HEADER = struct.Struct('!BBHI')
+_U16 = struct.Struct('!H')
+_U32 = struct.Struct('!I')
+_BOOL = struct.Struct('!?')
+_F64 = struct.Struct('!d')
+
 class CustomWireProtocol:
     """
     Custom wire protocol for message encoding and decoding.
@@ -25,6 +32,10 @@ class CustomWireProtocol:
     VERSION_MAJOR = 1  # Major version
     VERSION_MINOR = 0  # Minor version
 
+    # Header layout: version major, version minor, command, total length
+    HEADER = _HEADER
+    HEADER_SIZE = _HEADER.size
+
     # Command type constants
     CMD_CREATE = 1
     CMD_LOGIN = 2
@@ -57,7 +68,7 @@ class CustomWireProtocol:
             if isinstance(part, str):
                 # Encode string with length prefix (2 bytes for length)
                 encoded_str = part.encode('utf-8')
-                encoded_payload.append(struct.pack('!H', len(encoded_str)))
+                encoded_payload.append(_U16.pack(len(encoded_str)))
                 encoded_payload.append(encoded_str)
             elif isinstance(part, bytes):
                 # If it's already bytes, add directly
@@ -65,34 +76,34 @@ class CustomWireProtocol:
             elif isinstance(part, list):
                 # Handle lists of IDs or other types
                 if not part:
-                    encoded_payload.append(struct.pack('!H', 0))
+                    encoded_payload.append(_U16.pack(0))
                 else:
-                    encoded_payload.append(struct.pack('!H', len(part)))
+                    encoded_payload.append(_U16.pack(len(part)))
                     for item in part:
                         if isinstance(item, int):
                             # 4 bytes for integer IDs
-                            encoded_payload.append(struct.pack('!I', item))
+                            encoded_payload.append(_U32.pack(item))
             elif isinstance(part, bool):
                 # Boolean as 1 byte
-                encoded_payload.append(struct.pack('!?', part))
+                encoded_payload.append(_BOOL.pack(part))
             elif isinstance(part, int):
                 # Handle different integer sizes
                 if part > 65535:
                     # 4-byte integer
-                    encoded_payload.append(struct.pack('!I', part))
+                    encoded_payload.append(_U32.pack(part))
                 else:
                     # 2-byte integer for smaller numbers
-                    encoded_payload.append(struct.pack('!H', part))
+                    encoded_payload.append(_U16.pack(part))
             elif isinstance(part, float):
                 # 8-byte float for timestamps
-                encoded_payload.append(struct.pack('!d', part))
+                encoded_payload.append(_F64.pack(part))
         
         # Combine payload parts
         payload = b''.join(encoded_payload)
-        total_length = len(payload) + 8  # 2 (version) + 2 (cmd) + 4 (length)
+        total_length = len(payload) + _HEADER.size  # 2 (version) + 2 (cmd) + 4 (length)
 
         # Pack total = version (2 bytes) command (2 bytes), length (4 bytes), then payload
-        header = struct.pack('!BBHI', CustomWireProtocol.VERSION_MAJOR, CustomWireProtocol.VERSION_MINOR, cmd, total_length)
+        header = _HEADER.pack(CustomWireProtocol.VERSION_MAJOR, CustomWireProtocol.VERSION_MINOR, cmd, total_length)
 
         return header + payload
 
@@ -110,8 +121,8 @@ class CustomWireProtocol:
                 - cmd (int): The command identifier.
                 - payload (bytes): The payload data.
         """
-        version_major, version_minor, cmd, total_length = struct.unpack('!BBHI', data[:8])  # **New order**
-        payload = data[8:total_length]
+        version_major, version_minor, cmd, total_length = _HEADER.unpack_from(data)
+        payload = data[_HEADER.size:total_length]
         # return total_length, cmd, payload
         return version_major, version_minor, cmd, total_length, payload
 
@@ -131,11 +142,34 @@ class CustomWireProtocol:
         """
         if len(data) < 2:
             return "", data
-        length = struct.unpack('!H', data[:2])[0]
+        length = _U16.unpack_from(data)[0]
         if len(data) < 2 + length:
             return "", data
         return data[2:2+length].decode('utf-8'), data[2+length:]
 
+    @staticmethod
+    def iter_strings(data, offset=0):
+        """Yields consecutive length-prefixed strings from binary data.
+
+        Unlike repeated `decode_string` calls, this walks an offset instead of
+        copying the remaining data after every string. Iteration stops at the
+        first truncated entry.
+
+        Args:
+            data (bytes): The binary data containing the encoded strings.
+            offset (int, optional): Position of the first length prefix.
+
+        Yields:
+            str: Each decoded string, in order.
+        """
+        end = len(data)
+        while offset + 2 <= end:
+            start = offset + 2
+            offset = start + _U16.unpack_from(data, start - 2)[0]
+            if offset > end:
+                return
+            yield data[start:offset].decode('utf-8')
+
     @staticmethod
     def decode_success_response(payload):
         """
@@ -153,7 +187,7 @@ class CustomWireProtocol:
         if len(payload) < 1:
             return False, "Invalid response", b''
         
-        success = struct.unpack('!?', payload[:1])[0]
+        success = _BOOL.unpack_from(payload)[0]
         payload = payload[1:]
         
         # Decode message string
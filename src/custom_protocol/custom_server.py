@@ -2,10 +2,9 @@ import socket
 import struct
 import threading
 import hashlib
+import hmac
 import sys
-import re
 import os
-import fnmatch
 import time
 import logging
 from collections import defaultdict
@@ -14,6 +13,7 @@ from custom_protocol import CustomWireProtocol
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
 from config import Config
+from server_utils import glob_matcher, validate_password
 
 # Ensure logs directory exists in the project root
 LOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../logs")
@@ -66,6 +66,7 @@ class ChatServer:
         self.lock = threading.Lock()
         self.server = None
         self.running = False
+        self.stopped = threading.Event()  # Set once the accept loop has exited
         self.protocol = CustomWireProtocol()
 
     def hash_password(self, password):
@@ -75,9 +76,21 @@ class ChatServer:
             password (str): The password to hash.
 
         Returns:
-            str: The hashed password.
+            bytes: Raw 32-byte SHA-256 digest of the password.
         """
-        return hashlib.sha256(password.encode()).hexdigest()
+        return hashlib.sha256(password.encode()).digest()
+
+    def verify_password(self, password, password_hash):
+        """Checks a password against a stored hash in constant time.
+
+        Args:
+            password (str): The password to check.
+            password_hash (bytes): Stored digest from `hash_password`.
+
+        Returns:
+            bool: True if the password matches, False otherwise.
+        """
+        return hmac.compare_digest(self.hash_password(password), password_hash)
 
     def validate_password(self, password):
         """Validates password strength.
@@ -88,13 +101,7 @@ class ChatServer:
         Returns:
             bool: True if the password meets security requirements, False otherwise.
         """
-        if len(password) < 8:
-            return False
-        if not re.search(r"\d", password):
-            return False
-        if not re.search(r"[A-Z]", password):
-            return False
-        return True
+        return validate_password(password)
 
     def send_success_response(self, client_socket, cmd, success, message=None, payload_parts=None):
         """Sends a structured success response to a client.
@@ -120,7 +127,7 @@ class ChatServer:
         
         # Send encoded response
         response = self.protocol.encode_message(cmd, response_parts)
-        client_socket.send(response)
+        client_socket.sendall(response)
 
     def list_users(self, pattern):
         """Finds users matching a given search pattern.
@@ -131,14 +138,13 @@ class ChatServer:
         Returns:
             list: A list of matching users with their online/offline status.
         """
-        matches = []
-        for username in self.users:
-            if fnmatch.fnmatch(username.lower(), pattern.lower()):
-                matches.append({
-                    "username": username,
-                    "status": "online" if username in self.active_users else "offline"
-                })
-        return matches
+        match = glob_matcher(pattern)
+        active_users = self.active_users
+        return [
+            {"username": username, "status": "online" if username in active_users else "offline"}
+            for username in self.users
+            if match(username.lower())
+        ]
 
     def get_unread_count(self, username):
         """Gets the count of unread messages for a user.
@@ -160,7 +166,7 @@ class ChatServer:
         """
         logging.info(f"New connection from {address}")
         current_user = None
-        buffer = b''
+        buffer = bytearray()
 
         while True:
             try:
@@ -171,21 +177,22 @@ class ChatServer:
                 
                 buffer += chunk
 
-                # Process complete messages
-                while len(buffer) >= 8:
+                # Process every complete message in the buffer, then drop the consumed prefix once
+                offset = 0
+                while len(buffer) - offset >= CustomWireProtocol.HEADER_SIZE:
                     try:
-                        total_length = struct.unpack('!I', buffer[4:8])[0]
+                        total_length = CustomWireProtocol.HEADER.unpack_from(buffer, offset)[3]
                     except struct.error:
                         logging.error("Invalid message length")
                         break
 
                     # Check if we have a complete message
-                    if len(buffer) < total_length:
+                    if len(buffer) - offset < total_length:
                         break
                     
                     # Extract full message
-                    message_data = buffer[:total_length]
-                    buffer = buffer[total_length:]
+                    message_data = bytes(buffer[offset:offset + total_length])
+                    offset += total_length
 
                     # Safely decode message
                     try:
@@ -278,7 +285,7 @@ class ChatServer:
                                 )
                                 continue
 
-                            if self.users[username][0] != self.hash_password(password):
+                            if not self.verify_password(password, self.users[username][0]):
                                 self.send_success_response(
                                     client_socket, 
                                     cmd, 
@@ -378,7 +385,7 @@ class ChatServer:
                                         CustomWireProtocol.CMD_SEND,
                                         [True, "new_message", current_user, content]
                                     )
-                                    self.active_users[recipient].send(notification)
+                                    self.active_users[recipient].sendall(notification)
                                 except:
                                     pass  # Ignore notification failures
                             
@@ -507,7 +514,7 @@ class ChatServer:
                             # Decode password
                             password, _ = self.protocol.decode_string(payload)
 
-                            if self.users[current_user][0] != self.hash_password(password):
+                            if not self.verify_password(password, self.users[current_user][0]):
                                 self.send_success_response(
                                     client_socket, 
                                     cmd, 
@@ -559,6 +566,8 @@ class ChatServer:
                                 "Logged out successfully"
                             )
 
+                del buffer[:offset]
+
             except Exception as e:
                 logging.error(f"Error handling client: {e}")
                 break
@@ -586,6 +595,7 @@ class ChatServer:
         self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self.server.settimeout(1)
+        self.stopped.clear()
 
         try:
             self.server.bind((self.host, self.port))
@@ -597,6 +607,8 @@ class ChatServer:
                 try:
                     client_socket, address = self.server.accept()
                     client_socket.settimeout(None)
+                    # Chat frames are small and interactive; don't let Nagle hold them back
+                    client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
                     threading.Thread(target=self.handle_client, 
                                     args=(client_socket, address), 
                                     daemon=True).start()
@@ -607,18 +619,27 @@ class ChatServer:
                     continue
         finally:
             self.server.close()
+            self.stopped.set()
 
     def stop(self):
-        """Stops the chat server by closing the socket and terminating active connections."""
+        """Stops the chat server by closing the socket and terminating active connections.
+
+        Shutting the listening socket down wakes a blocked `accept()` right away
+        instead of leaving the loop to notice on its next 1s timeout.
+        """
         self.running = False
         if self.server:
+            try:
+                self.server.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass  # Not supported on listening sockets everywhere; the timeout still applies
             self.server.close()
 
     def find_free_port(self, start_port):
         """Finds an available port starting from a given number.
 
         Args:
-            start_port (int): The starting port number.
+            start_port (int): The starting port number; 0 lets the OS pick one.
 
         Returns:
             int: The first available port number.
@@ -626,20 +647,14 @@ class ChatServer:
         Raises:
             RuntimeError: If no free ports are available.
         """
-        port = start_port
-        max_port = 65535
-        
-        while port <= max_port:
-            try:
-                test_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        for port in range(start_port, 65536):
+            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as test_socket:
                 test_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-                test_socket.bind((self.host, port))
-                test_socket.close()
-                return port
-            except OSError:
-                port += 1
-            finally:
-                test_socket.close()
+                try:
+                    test_socket.bind((self.host, port))
+                except OSError:
+                    continue
+                return port or test_socket.getsockname()[1]
         raise RuntimeError("No free ports available")
 
 if __name__ == "__main__":
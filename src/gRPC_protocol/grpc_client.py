@@ -609,8 +609,9 @@ class ChatClient:
             
             self.accounts_list.delete(*self.accounts_list.get_children())
             
+            insert_row = self.accounts_list.insert
             for user in response.users:
-                self.accounts_list.insert("", "end", values=(user.username, user.status))
+                insert_row("", "end", iid=user.username, values=(user.username, user.status))
             
             # Update both total and online user counts
             total_users = len(response.users)
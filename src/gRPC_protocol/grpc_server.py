@@ -1,8 +1,9 @@
 import grpc
 import hashlib
-import re
+import hmac
+import heapq
 import os
-import fnmatch
+import operator
 import time
 import logging
 import threading
@@ -16,6 +17,7 @@ parent_dir = os.path.dirname(current_dir)
 sys.path.insert(0, parent_dir)
 
 from config import Config
+from server_utils import glob_matcher, validate_password
 import chat_pb2 as chat
 import chat_pb2_grpc as rpc
 
@@ -32,6 +34,9 @@ logging.basicConfig(
     format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
+# Sort key for message dicts (avoids a lambda call per comparison)
+_ts_getter = operator.itemgetter("timestamp")
+
 class ChatServer(rpc.ChatServerServicer):
     """A gRPC-based chat server that handles client connections, user authentication, 
     and message exchange.
@@ -39,7 +44,7 @@ class ChatServer(rpc.ChatServerServicer):
     Attributes:
         users (dict): Stores user credentials and settings.
         messages (defaultdict): Stores messages per user.
-        active_users (dict): Tracks active user connections.
+        active_users (set): Usernames that are currently logged in.
         message_id_counter (int): Counter for message IDs.
         lock (threading.Lock): Lock for thread-safe operations.
     """
@@ -52,7 +57,7 @@ class ChatServer(rpc.ChatServerServicer):
         self.config = Config()
         self.users = {}  # username -> (password_hash, settings)
         self.messages = defaultdict(list)  # username -> [messages]
-        self.active_users = {}  # username -> connected (context)
+        self.active_users = set()  # logged-in usernames
         self.message_id_counter = 0
         self.lock = threading.Lock()
         self.active_streams = {}  # username -> list of stream contexts
@@ -64,9 +69,21 @@ class ChatServer(rpc.ChatServerServicer):
             password (str): Password to be hashed.
 
         Returns:
-            str: Hashed password.
+            bytes: Raw 32-byte SHA-256 digest of the password.
+        """
+        return hashlib.sha256(password.encode()).digest()
+
+    def verify_password(self, password, password_hash):
+        """Checks a password against a stored hash in constant time.
+
+        Args:
+            password (str): Password to be checked.
+            password_hash (bytes): Stored digest from `hash_password`.
+
+        Returns:
+            bool: True if the password matches, False otherwise.
         """
-        return hashlib.sha256(password.encode()).hexdigest()
+        return hmac.compare_digest(self.hash_password(password), password_hash)
 
     def validate_password(self, password):
         """Validates password strength.
@@ -77,13 +94,7 @@ class ChatServer(rpc.ChatServerServicer):
         Returns:
             bool: True if password meets requirements, False otherwise.
         """
-        if len(password) < 8:
-            return False
-        if not re.search(r"\d", password):
-            return False
-        if not re.search(r"[A-Z]", password):
-            return False
-        return True
+        return validate_password(password)
 
     def get_unread_count(self, username):
         """Returns the count of unread messages for a user.
@@ -94,7 +105,8 @@ class ChatServer(rpc.ChatServerServicer):
         Returns:
             int: Number of unread messages.
         """
-        return len([msg for msg in self.messages[username] if not msg["read"]])
+        # .get() so counting for an unknown user doesn't add an empty inbox
+        return sum(1 for msg in self.messages.get(username, ()) if not msg["read"])
 
     # The stream which will be used to send new messages to clients
     def ChatStream(self, request_iterator, context):
@@ -162,7 +174,7 @@ class ChatServer(rpc.ChatServerServicer):
                         self.active_streams[username].remove(context)  
                     # Mark user offline if no active streams  
                     if not self.active_streams.get(username):  
-                        del self.active_users[username]  
+                        self.active_users.discard(username)  
 
     def SendCreateAccount(self, request, context):
         """Creates a new user account.
@@ -215,14 +227,14 @@ class ChatServer(rpc.ChatServerServicer):
             if username not in self.users:
                 logging.warning(f"Failed login attempt from {client_address}: User '{username}' not found")
                 return chat.Reply(error=True, message="User not found")
-            elif self.users[username][0] != self.hash_password(password):
+            elif not self.verify_password(password, self.users[username][0]):
                 logging.warning(f"Failed login attempt from {client_address}: Incorrect password for '{username}'")
                 return chat.Reply(error=True, message="Invalid password")
             elif username in self.active_users:
                 logging.warning(f"Failed login attempt from {client_address}: '{username}' already logged in")
                 return chat.Reply(error=True, message="User already logged in")
             else:
-                self.active_users[username] = True
+                self.active_users.add(username)
                 unread_count = self.get_unread_count(username)
                 logging.info(f"User '{username}' logged in from {client_address}")
                 
@@ -247,7 +259,7 @@ class ChatServer(rpc.ChatServerServicer):
             if username in self.active_users:
                 if username in self.active_streams:  
                     del self.active_streams[username]  
-                del self.active_users[username] 
+                self.active_users.discard(username)
                 logging.info(f"User '{username}' logged out from {client_address}")
                 return chat.Reply(error=False, message="Logged out successfully")
             else:
@@ -272,15 +284,14 @@ class ChatServer(rpc.ChatServerServicer):
             if username not in self.users:
                 logging.warning(f"Failed account deletion from {client_address}: User not found")
                 return chat.Reply(error=True, message="User not found")
-            elif self.users[username][0] != self.hash_password(password):
+            elif not self.verify_password(password, self.users[username][0]):
                 logging.warning(f"Failed account deletion for {username} - Incorrect password")
                 return chat.Reply(error=True, message="Invalid password")
             else:
                 del self.users[username]
                 del self.messages[username]
                 
-                if username in self.active_users:
-                    del self.active_users[username]
+                self.active_users.discard(username)
                 
                 logging.info(f"Account deleted: {username} from {client_address}")
                 return chat.Reply(error=False, message="Account deleted")
@@ -384,27 +395,28 @@ class ChatServer(rpc.ChatServerServicer):
             # Get read messages sorted by timestamp  
             read_messages = sorted(  
                 [msg for msg in self.messages[username] if msg["read"]],  
-                key=lambda x: x["timestamp"],  
+                key=_ts_getter,  
                 reverse=True  
             )
-            
-            # Convert to proto messages  
-            proto_messages = [  
-                chat.Message(  
-                    id=m["id"],  
-                    username=m["from"],  
-                    to=username,  
-                    content=m["content"],  
-                    timestamp=m["timestamp"],  
-                    read=True,  
-                    delivered_while_offline=m["delivered_while_offline"]  
-                ) for m in read_messages  
-            ]  
-            
-            return chat.MessageList(  
-                error=False,  
-                messages=proto_messages  
-            )  
+
+        # Convert to proto messages outside the lock; the selected fields
+        # never change once a message is stored
+        proto_messages = [  
+            chat.Message(  
+                id=m["id"],  
+                username=m["from"],  
+                to=username,  
+                content=m["content"],  
+                timestamp=m["timestamp"],  
+                read=True,  
+                delivered_while_offline=m["delivered_while_offline"]  
+            ) for m in read_messages  
+        ]  
+        
+        return chat.MessageList(  
+            error=False,  
+            messages=proto_messages  
+        )  
 
     def SendGetUndelivered(self, request, context):
         """Gets unread messages for a user.
@@ -425,9 +437,12 @@ class ChatServer(rpc.ChatServerServicer):
                 logging.warning(f"Failed get_undelivered request from {client_address}: User not logged in")
                 return chat.MessageList(error=True, message="Not logged in")  
             
-            # Get unread messages and mark them as read  
-            unread = [msg for msg in self.messages[username] if not msg["read"]]  
-            unread_sorted = sorted(unread, key=lambda x: x["timestamp"], reverse=True)[:count]  
+            # Get the newest `count` unread messages and mark them as read  
+            unread_sorted = heapq.nlargest(
+                count,
+                (m for m in self.messages[username] if not m["read"]),
+                key=_ts_getter
+            )
             
             # Finalize read status and clean flags  
             for msg in unread_sorted:  
@@ -435,23 +450,23 @@ class ChatServer(rpc.ChatServerServicer):
                 if "stream_notified" in msg:  
                     del msg["stream_notified"]  # Clean notification flag  
                                 
-            # Convert to proto messages  
-            proto_messages = [  
-                chat.Message(  
-                    id=m["id"],  
-                    username=m["from"],  
-                    to=username,  
-                    content=m["content"],  
-                    timestamp=m["timestamp"],  
-                    read=True,  
-                    delivered_while_offline=m["delivered_while_offline"]  
-                ) for m in unread_sorted  
-            ]  
-            
-            return chat.MessageList(  
-                error=False,  
-                messages=proto_messages  
-            )  
+        # Convert to proto messages outside the lock  
+        proto_messages = [  
+            chat.Message(  
+                id=m["id"],  
+                username=m["from"],  
+                to=username,  
+                content=m["content"],  
+                timestamp=m["timestamp"],  
+                read=True,  
+                delivered_while_offline=m["delivered_while_offline"]  
+            ) for m in unread_sorted  
+        ]  
+        
+        return chat.MessageList(  
+            error=False,  
+            messages=proto_messages  
+        )  
     
     def SendDeleteMessages(self, request, context):
         """Deletes messages for a user.
@@ -500,15 +515,17 @@ class ChatServer(rpc.ChatServerServicer):
         elif not pattern.endswith("*"):
             pattern = pattern + "*"
         
+        match = glob_matcher(pattern)
         with self.lock:
             # Find matching users
-            matches = []
-            for user in self.users:
-                if fnmatch.fnmatch(user.lower(), pattern.lower()):
-                    matches.append(chat.User(
-                        username=user,
-                        status="online" if user in self.active_users else "offline"
-                    ))
+            matches = [
+                chat.User(
+                    username=user,
+                    status="online" if user in self.active_users else "offline"
+                )
+                for user in self.users
+                if match(user.lower())
+            ]
             
             logging.info(f"User list requested from {client_address}, found {len(matches)} users")
             return chat.UserList(
@@ -541,8 +558,7 @@ class ChatServer(rpc.ChatServerServicer):
             list: List of sorted unread messages.
         """
         messages = self.messages[username]
-        unread_messages = [m for m in messages if not m["read"]]
-        return sorted(unread_messages, key=lambda x: x["timestamp"], reverse=True)[:count]
+        return heapq.nlargest(count, (m for m in messages if not m["read"]), key=_ts_getter)
 
 def serve(host, port):
     """Starts the gRPC server.
@@ -576,8 +592,7 @@ def serve(host, port):
         server.start()
         print("Server started. Use Ctrl+C to stop.")
         try:
-            while True:
-                time.sleep(60*60*24)  # Sleep for a day (or until interrupted)
+            server.wait_for_termination()  # Block until stopped (or interrupted)
         except KeyboardInterrupt:
             print("Stopping server...")
     finally:
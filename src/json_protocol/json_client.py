@@ -1,5 +1,6 @@
 import socket
 import json
+import codecs
 import threading
 import argparse
 import sys
@@ -13,6 +14,23 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
 from config import Config
 from utils import MessageFrame
 
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the standard library
+    orjson = None
+
+def _loads(data):
+    """Parses a JSON document from bytes or str, using `orjson` when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def _dumps(obj):
+    """Serializes `obj` to compact UTF-8 JSON bytes, using `orjson` when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode()
+
 class ChatClient:
     """A GUI-based chat client for sending and receiving messages."""
     def __init__(self, host, port):
@@ -36,8 +54,13 @@ class ChatClient:
             messagebox.showerror("Error", "Could not connect to server")
             self.root.destroy()
             return
+        # Commands are small and interactive; don't let Nagle hold them back
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
             
         self.username = None
+        self.pending_users = None  # Latest user list waiting to be drawn
+        self.account_rows = {}  # username -> row values currently shown in accounts_list
+        self.search_after = None  # Pending debounced search, if any
         self.setup_gui()
         self.running = True
         threading.Thread(target=self.receive_messages, daemon=True).start()
@@ -153,6 +176,7 @@ class ChatClient:
         self.search_var = tk.StringVar()
         search_entry = ttk.Entry(search_frame, textvariable=self.search_var)
         search_entry.pack(side='left', fill='x', expand=True, padx=5)
+        search_entry.bind('<KeyRelease>', self.on_search_changed)
         
         ttk.Button(search_frame, text="Search", 
                 command=self.search_accounts).pack(side='right', padx=5)
@@ -352,6 +376,21 @@ class ChatClient:
             "pattern": pattern
         })
 
+    def on_search_changed(self, event=None):
+        """Searches once typing pauses, instead of sending a request per keystroke.
+
+        Args:
+            event (tk.Event, optional): The key event that changed the search text.
+        """
+        if self.search_after is not None:
+            self.root.after_cancel(self.search_after)
+        self.search_after = self.root.after(200, self.run_pending_search)
+
+    def run_pending_search(self):
+        """Runs the search scheduled by `on_search_changed`."""
+        self.search_after = None
+        self.search_accounts()
+
     def delete_account(self):
         """Sends a request to the server to delete the user's account."""
         if not self.username:
@@ -375,6 +414,30 @@ class ChatClient:
         if self.username:
             self.send_command({"cmd": "logout"})
 
+    def update_accounts_list(self):
+        """Redraws the accounts list from the most recent user list received."""
+        users, self.pending_users = self.pending_users, None
+        if users is None:
+            return
+        rows = {user["username"]: (user["username"], user["status"]) for user in users}
+
+        # Touch only rows that changed; each Treeview delete/insert is a Tk round-trip
+        insert_row, update_row = self.accounts_list.insert, self.accounts_list.item
+        for username in self.account_rows.keys() - rows.keys():
+            self.accounts_list.delete(username)
+        for username, values in rows.items():
+            shown = self.account_rows.get(username)
+            if shown is None:
+                insert_row("", "end", iid=username, values=values)
+            elif shown != values:
+                update_row(username, values=values)
+        self.account_rows = rows
+        
+        # Update both total and online user counts
+        online_users = sum(1 for user in users if user['status'] == 'online')
+        self.user_count_var.set(f"Users found: {len(users)}")
+        self.online_count_var.set(f"Online users: {online_users}")
+
     def clear_messages(self):
         """Clears all messages displayed in the chat window."""
         for widget in self.messages_frame.winfo_children():
@@ -388,7 +451,7 @@ class ChatClient:
         """
         command["version"] = "1.0"  # Add version to every message
         try:
-            self.socket.send(json.dumps(command).encode())
+            self.socket.sendall(_dumps(command))
         except Exception as e:
             messagebox.showerror("Error", f"Failed to send command: {e}")
             self.on_connection_lost()
@@ -396,26 +459,31 @@ class ChatClient:
     def receive_messages(self):
         """Continuously receives and processes messages from the server."""
         buffer = ""
+        # Server replies are raw UTF-8, so a character may straddle two reads
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        chunk = bytearray(4096)  # Reused for every read
+        view = memoryview(chunk)
         while self.running:
             try:
-                data = self.socket.recv(4096).decode()
-                if not data:
-                    self.on_connection_lost()
+                n = self.socket.recv_into(chunk)
+                if not n:
+                    # Runs on the receive thread; Tk widgets may only be touched from mainloop
+                    self.root.after(0, self.on_connection_lost)
                     break
                     
-                buffer += data
+                buffer += decoder.decode(view[:n])
                 
-                # Process complete JSON messages
-                while True:
+                # Server replies are newline-terminated; keep any partial frame for the next read
+                *frames, buffer = buffer.split("\n")
+                for frame in frames:
+                    if not frame:
+                        continue
                     try:
-                        message_end = buffer.index("}{") if "}{" in buffer else len(buffer)
-                        message = json.loads(buffer[:message_end+1])
-                        buffer = buffer[message_end+1:]
-                        
-                        self.root.after(0, self.handle_message, message)
+                        message = _loads(frame)
                     except ValueError:
-                        # Incomplete message or no more complete messages
-                        break
+                        print(f"Discarding malformed message: {frame[:80]!r}")
+                        continue
+                    self.root.after(0, self.handle_message, message)
                     
             except Exception as e:
                 if self.running:
@@ -450,18 +518,10 @@ class ChatClient:
                     frame.pack(fill='x', padx=5, pady=2)
                     
             elif "users" in message:
-                self.accounts_list.delete(*self.accounts_list.get_children())
-                
-                for user in message["users"]:
-                    username = user["username"]
-                    status = user["status"]
-                    self.accounts_list.insert("", "end", values=(username, status))
-                
-                # Update both total and online user counts
-                total_users = len(message['users'])
-                online_users = sum(1 for user in message['users'] if user['status'] == 'online')
-                self.user_count_var.set(f"Users found: {total_users}")
-                self.online_count_var.set(f"Online users: {online_users}")
+                # Logins and logouts arrive in bursts; draw only the newest list once idle
+                if self.pending_users is None:
+                    self.root.after_idle(self.update_accounts_list)
+                self.pending_users = message["users"]
                     
             elif message.get("message") == "Logged out successfully":
                 self.username = None
@@ -2,17 +2,24 @@ import socket
 import json
 import threading
 import hashlib
+import hmac
+import heapq
 import sys
-import re
 import os
-import fnmatch
+import operator
 import time
 import logging
 from collections import defaultdict
 
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the standard library
+    orjson = None
+
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
 
 from config import Config
+from server_utils import glob_matcher, validate_password
 
 # Ensure logs directory exists in the project root
 LOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../logs")
@@ -27,6 +34,29 @@ logging.basicConfig(
     format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
+def _loads(data):
+    """Parses a JSON request from bytes-like data, using `orjson` when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(bytes(data))
+
+def _dumps(obj):
+    """Serializes `obj` to one newline-terminated JSON frame, using `orjson` when it is installed.
+
+    Compact JSON never contains a raw newline, so clients can split the stream on it.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
+    return json.dumps(obj).encode() + b"\n"
+
+# Fixed error replies, encoded once at import
+_ERR_BAD_JSON = _dumps({"success": False, "error": "Invalid JSON format"})
+_ERR_BAD_VERSION = _dumps({"success": False, "error": "Unsupported protocol version"})
+_ERR_BAD_CMD = _dumps({"success": False, "message": "Invalid command"})
+
+# Sort key for message dicts (avoids a lambda call per comparison)
+_ts_getter = operator.itemgetter("timestamp")
+
 class ChatServer:
     """A multi-threaded chat server that handles client connections, user authentication, 
     and message exchange using JSON protocol.
@@ -63,6 +93,8 @@ class ChatServer:
         self.lock = threading.Lock()
         self.server = None
         self.running = False
+        self.ready = threading.Event()  # Set once the server is listening
+        self.stopped = threading.Event()  # Set once the accept loop has exited
 
     def hash_password(self, password):
         """Hashes a password using SHA-256.
@@ -71,9 +103,21 @@ class ChatServer:
             password (str): Password to be hashed.
 
         Returns:
-            str: Hashed password.
+            bytes: Raw 32-byte SHA-256 digest of the password.
         """
-        return hashlib.sha256(password.encode()).hexdigest()
+        return hashlib.sha256(password.encode()).digest()
+
+    def verify_password(self, password, password_hash):
+        """Checks a password against a stored hash in constant time.
+
+        Args:
+            password (str): Password to be checked.
+            password_hash (bytes): Stored digest from `hash_password`.
+
+        Returns:
+            bool: True if the password matches, False otherwise.
+        """
+        return hmac.compare_digest(self.hash_password(password), password_hash)
 
     def validate_password(self, password):
         """Validates password strength.
@@ -84,13 +128,7 @@ class ChatServer:
         Returns:
             bool: True if password meets requirements, False otherwise.
         """
-        if len(password) < 8:
-            return False
-        if not re.search(r"\d", password):
-            return False
-        if not re.search(r"[A-Z]", password):
-            return False
-        return True
+        return validate_password(password)
 
     def get_unread_count(self, username):
         """Returns the count of unread messages for a user.
@@ -101,7 +139,7 @@ class ChatServer:
         Returns:
             int: Number of unread messages.
         """
-        return len([msg for msg in self.messages[username] if not msg["read"]])
+        return sum(1 for msg in self.messages[username] if not msg["read"])
 
     def handle_client(self, client_socket, address):
         """Handles communication with a connected client.
@@ -112,31 +150,32 @@ class ChatServer:
         """
         logging.info(f"New connection from {address}")
         current_user = None
+        # One receive buffer per connection, refilled in place by recv_into
+        buf = bytearray(4096)
+        view = memoryview(buf)
 
         while True:
             try:
-                data = client_socket.recv(4096).decode()
-                if not data:
+                n = client_socket.recv_into(buf)
+                if not n:
                     break
 
                 try:
-                    msg = json.loads(data)  # Ensure valid JSON
-                except json.JSONDecodeError:
+                    msg = _loads(view[:n])  # Ensure valid JSON
+                except ValueError:  # Malformed JSON or invalid UTF-8
                     logging.warning(f"Invalid JSON received from {address}")
-                    response = {"success": False, "error": "Invalid JSON format"}
-                    client_socket.send(json.dumps(response).encode())
+                    client_socket.sendall(_ERR_BAD_JSON)
                     continue  
 
                 # Version Check
                 if "version" not in msg or msg["version"] != "1.0":
                     logging.warning(f"Client {address} sent unsupported version: {msg.get('version')}")
-                    response = {"success": False, "error": "Unsupported protocol version"}
-                    client_socket.send(json.dumps(response).encode())
+                    client_socket.sendall(_ERR_BAD_VERSION)
                     continue  
 
                 # Get the operation code
                 cmd = msg.get("cmd")
-                response = {"success": False, "message": "Invalid command"}
+                response = None  # Stays None for unknown commands
                 
                 with self.lock:
                     if cmd == "create":
@@ -176,7 +215,7 @@ class ChatServer:
                         if username not in self.users:
                             logging.warning(f"Failed login attempt from {address}: User '{username}' not found")
                             response = {"success": False, "message": "User not found"}
-                        elif self.users[username][0] != self.hash_password(password):
+                        elif not self.verify_password(password, self.users[username][0]):
                             logging.warning(f"Failed login attempt from {address}: Incorrect password for '{username}'")
                             response = {"success": False, "message": "Invalid password"}
                         elif username in self.active_users:
@@ -196,32 +235,10 @@ class ChatServer:
                                 "unread": unread_count
                             }
 
-                            # Build the list of all users with online/offline status
-                            users_list = []
-                            for user in self.users:
-                                users_list.append({
-                                    "username": user,
-                                    "status": "online" if user in self.active_users else "offline"
-                                })
-
-                            # Send login success response + user list to the logged-in client
-                            user_response = {
-                                "success": True,
-                                "users": users_list
-                            }
-                            client_socket.send(json.dumps(response).encode())
-                            client_socket.send(json.dumps(user_response).encode())
-
-                            # Broadcast updated user list to all active clients
-                            for active_client in self.active_users.values():
-                                if active_client != client_socket:
-                                    try:
-                                        active_client.send(json.dumps({
-                                            "success": True,
-                                            "users": users_list
-                                        }).encode())
-                                    except Exception:
-                                        pass
+                            # Send login success response, then the user list; the new user is
+                            # already active, so the broadcast payload reaches this client too
+                            client_socket.sendall(_dumps(response))
+                            self.broadcast_user_list()
 
                     elif cmd == "list":
                         pattern = msg.get("pattern", "*")
@@ -233,13 +250,12 @@ class ChatServer:
                             pattern = pattern + "*"
 
                         # Find matching users
-                        matches = []
-                        for username in self.users:
-                            if fnmatch.fnmatch(username.lower(), pattern.lower()):
-                                matches.append({
-                                    "username": username,
-                                    "status": "online" if username in self.active_users else "offline"
-                                })
+                        match = glob_matcher(pattern)
+                        matches = [
+                            {"username": username, "status": "online" if username in self.active_users else "offline"}
+                            for username in self.users
+                            if match(username.lower())
+                        ]
 
                         response = {"success": True, "users": matches}
                         logging.info(f"User list requested from {address}, found {len(matches)} users")
@@ -269,11 +285,11 @@ class ChatServer:
                                 # If recipient is active, send immediately
                                 if recipient in self.active_users:
                                     try:
-                                        self.active_users[recipient].send(json.dumps({
+                                        self.active_users[recipient].sendall(_dumps({
                                             "success": True,
                                             "message_type": "new_message",
                                             "message": message
-                                        }).encode())
+                                        }))
                                     except:
                                         pass  
 
@@ -328,7 +344,7 @@ class ChatServer:
                         else:
                             password = msg.get("password")
 
-                            if self.users[current_user][0] != self.hash_password(password):
+                            if not self.verify_password(password, self.users[current_user][0]):
                                 response = {"success": False, "message": "Invalid password"}
                                 logging.warning(f"Failed account deletion for {current_user} - Incorrect password")
                             else:
@@ -359,28 +375,13 @@ class ChatServer:
 
                             logging.info(f"User '{current_user}' logged out")
 
-                            # Build updated user list to notify other clients
-                            users_list = []
-                            for user in self.users:
-                                users_list.append({
-                                    "username": user,
-                                    "status": "online" if user in self.active_users else "offline"
-                                })
-
                             # Notify all active clients about the updated user list
-                            for client in self.active_users.values():
-                                try:
-                                    client.send(json.dumps({
-                                        "success": True,
-                                        "users": users_list
-                                    }).encode())
-                                except:
-                                    pass  # Ignore if a client fails to receive the message
+                            self.broadcast_user_list()
 
                             current_user = None
                             response = {"success": True, "message": "Logged out successfully"}
             
-                client_socket.send(json.dumps(response).encode())
+                client_socket.sendall(_ERR_BAD_CMD if response is None else _dumps(response))
 
             except Exception as e:
                 print(f"Error handling client: {e}")
@@ -391,21 +392,7 @@ class ChatServer:
             del self.active_users[current_user]
             
             # Broadcast updated user list to all active clients
-            users_list = []
-            for user in self.users:
-                users_list.append({
-                    "username": user,
-                    "status": "online" if user in self.active_users else "offline"
-                })
-            
-            for client in self.active_users.values():
-                try:
-                    client.send(json.dumps({
-                        "success": True,
-                        "users": users_list
-                    }).encode())
-                except:
-                    pass
+            self.broadcast_user_list()
         
         client_socket.close()
 
@@ -415,20 +402,17 @@ class ChatServer:
         Returns:
             list: List of users with online/offline status.
         """
-        users_list = []
-        for user in self.users:
-            users_list.append({
-                "username": user,
-                "status": "online" if user in self.active_users else "offline"
-            })
-        
-        # Send to all active clients
-        for client in self.active_users.values():
+        active_users = self.active_users
+        users_list = [
+            {"username": user, "status": "online" if user in active_users else "offline"}
+            for user in self.users
+        ]
+
+        # Serialize once and send the same payload to all active clients
+        payload = _dumps({"success": True, "users": users_list})
+        for client in active_users.values():
             try:
-                client.send(json.dumps({
-                    "success": True,
-                    "users": users_list
-                }).encode())
+                client.sendall(payload)
             except:
                 pass
         return users_list
@@ -444,7 +428,7 @@ class ChatServer:
         """
         messages = self.messages[username]
         read_messages = [m for m in messages if m["read"]]
-        return sorted(read_messages, key=lambda x: x["timestamp"], reverse=True)
+        return sorted(read_messages, key=_ts_getter, reverse=True)
 
     def get_unread_messages(self, username, count):
         """Retrieves unread messages for a user.
@@ -457,35 +441,28 @@ class ChatServer:
             list: List of sorted unread messages.
         """
         messages = self.messages[username]
-        unread_messages = [m for m in messages if not m["read"]]
-        return sorted(unread_messages, key=lambda x: x["timestamp"], reverse=True)[:count]
+        return heapq.nlargest(count, (m for m in messages if not m["read"]), key=_ts_getter)
 
     def find_free_port(self, start_port):
-        """Finds an available port starting from a given port.
+        """Finds an available port starting from a given number.
 
         Args:
-            start_port (int): Starting port number.
+            start_port (int): The starting port number; 0 lets the OS pick one.
 
         Returns:
-            int: First available port number.
+            int: The first available port number.
 
         Raises:
             RuntimeError: If no free ports are available.
         """
-        port = start_port
-        max_port = 65535
-        
-        while port <= max_port:
-            try:
-                test_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        for port in range(start_port, 65536):
+            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as test_socket:
                 test_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-                test_socket.bind((self.host, port))
-                test_socket.close()
-                return port
-            except OSError:
-                port += 1
-            finally:
-                test_socket.close()
+                try:
+                    test_socket.bind((self.host, port))
+                except OSError:
+                    continue
+                return port or test_socket.getsockname()[1]
         raise RuntimeError("No free ports available")
 
     def start(self):
@@ -511,17 +488,22 @@ class ChatServer:
         self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self.server.settimeout(1)
+        self.ready.clear()
+        self.stopped.clear()
 
         try:
             self.server.bind((self.host, self.port))
             self.server.listen(5)
             self.running = True
+            self.ready.set()
             print(f"Server started on {self.host}:{self.port}")
 
             while self.running:
                 try:
                     client_socket, address = self.server.accept()
                     client_socket.settimeout(None)
+                    # Chat frames are small and interactive; don't let Nagle hold them back
+                    client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
                     threading.Thread(target=self.handle_client, 
                                     args=(client_socket, address), 
                                     daemon=True).start()
@@ -532,6 +514,7 @@ class ChatServer:
                     continue
         finally:
             self.server.close()
+            self.stopped.set()
 
 
     def stop(self):
@@ -0,0 +1,34 @@
+import fnmatch
+import functools
+import re
+
+
+@functools.lru_cache(maxsize=64)
+def glob_matcher(pattern):
+    """Compiles a shell-style pattern once into a match function for lowercased names.
+
+    Args:
+        pattern (str): Search pattern (supports wildcards).
+
+    Returns:
+        callable: `re.Pattern.match` for the lowercased pattern.
+    """
+    return re.compile(fnmatch.translate(pattern.lower())).match
+
+
+# At least one digit and one uppercase letter; length is checked separately
+_PASSWORD_RE = re.compile(r"(?=.*\d)(?=.*[A-Z])", re.DOTALL)
+
+
+def validate_password(password):
+    """Validates password strength.
+
+    Args:
+        password (str): Password to be validated.
+
+    Returns:
+        bool: True if password meets requirements, False otherwise.
+    """
+    if len(password) < 8:
+        return False
+    return _PASSWORD_RE.match(password) is not None
@@ -1,9 +1,22 @@
 
+import functools
 import time
 
 import tkinter as tk
 from tkinter import ttk, messagebox
 
+@functools.lru_cache(maxsize=4096)
+def _fmt_ts(sec):
+    """Formats a whole-second timestamp once for every frame that shows it.
+
+    Args:
+        sec (int): Seconds since the epoch.
+
+    Returns:
+        str: Local time as 'YYYY-mm-dd HH:MM:SS'.
+    """
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(sec))
+
 class MessageFrame(ttk.Frame):
     """Represents a message frame in the chat GUI."""
 
@@ -27,8 +40,7 @@ class MessageFrame(ttk.Frame):
         select_cb = ttk.Checkbutton(header_frame, variable=self.select_var)
         select_cb.pack(side='left', padx=(0, 5))
         
-        time_str = time.strftime('%Y-%m-%d %H:%M:%S', 
-                               time.localtime(message_data["timestamp"]))
+        time_str = _fmt_ts(int(message_data["timestamp"]))
         sender_label = ttk.Label(
             header_frame, 
             text=f"From: {message_data['from']} at {time_str}",
@@ -13,19 +13,37 @@ def config():
         mock_exists.return_value = False
         return Config()
 
+SAMPLE_CONFIG = {
+    "host": "192.168.1.100",
+    "port": 12345,
+    "message_fetch_limit": 10
+}
+SAMPLE_CONFIG_JSON = json.dumps(SAMPLE_CONFIG).encode()
+
 @pytest.fixture
 def sample_config_data():
-    return {
-        "host": "192.168.1.100",
-        "port": 12345,
-        "message_fetch_limit": 10
-    }
+    return dict(SAMPLE_CONFIG)
 
 def test_init_default_values(config):
     assert config.config['port'] == 50000
     assert config.config['message_fetch_limit'] == 5
     assert Config.HOST is not None
 
+class MockSocket:
+    """Minimal UDP socket stand-in for `Config.get_local_ip`."""
+
+    def __init__(self, ip_address):
+        self.ip_address = ip_address
+
+    def connect(self, address):
+        pass
+
+    def getsockname(self):
+        return (self.ip_address, 0)
+
+    def close(self):
+        pass
+
 @pytest.mark.parametrize("ip_address", [
     "192.168.1.100",
     "10.0.0.1",
@@ -33,11 +51,7 @@ def test_init_default_values(config):
 ])
 def test_get_local_ip(monkeypatch, ip_address):
     def mock_socket(*args, **kwargs):
-        mock_sock = type('MockSocket', (), {
-            'getsockname': lambda: (ip_address, 0),
-            'close': lambda: None
-        })
-        return mock_sock()
+        return MockSocket(ip_address)
     
     with patch('socket.socket', mock_socket):
         assert Config.get_local_ip() == ip_address
@@ -50,7 +64,7 @@ def test_get_local_ip_failure(monkeypatch):
         assert Config.get_local_ip() == "127.0.0.1"
 
 def test_load_config_existing_file(sample_config_data):
-    mock_file = mock_open(read_data=json.dumps(sample_config_data))
+    mock_file = mock_open(read_data=SAMPLE_CONFIG_JSON)
     
     with patch('os.path.exists') as mock_exists, \
          patch('builtins.open', mock_file):
@@ -74,15 +88,26 @@ def test_load_config_file_error():
 def test_save_config(config, sample_config_data):
     mock_file = mock_open()
     
-    with patch('builtins.open', mock_file):
+    with patch('builtins.open', mock_file), patch('os.replace') as mock_replace:
         config.config = sample_config_data.copy()
         config.save_config()
         
-        mock_file.assert_called_once_with("chat_config.json", 'w')
+        mock_file.assert_called_once_with("chat_config.json.tmp", 'w')
         handle = mock_file()
         handle.write.assert_called_once()
         written_data = json.loads(handle.write.call_args[0][0])
         assert written_data == sample_config_data
+        mock_replace.assert_called_once_with("chat_config.json.tmp", "chat_config.json")
+
+def test_save_config_unserializable_keeps_file(config, tmp_path):
+    config_file = tmp_path / "chat_config.json"
+    config_file.write_text(SAMPLE_CONFIG_JSON.decode())
+    config.config_file = str(config_file)
+    config.config["host"] = object()
+    
+    with pytest.raises(TypeError):
+        config.save_config()
+    assert json.loads(config_file.read_text()) == SAMPLE_CONFIG
 
 def test_save_config_error(config):
     with patch('builtins.open') as mock_file:
@@ -102,7 +127,7 @@ def test_get_config_value(config, sample_config_data):
 def test_update_config(config):
     new_port = 54321
     
-    with patch('builtins.open', mock_open()):
+    with patch('builtins.open', mock_open()), patch('os.replace'):
         config.update('port', new_port)
         assert config.config['port'] == new_port
 
@@ -22,16 +22,27 @@ class MockSocket:
     def connect(self, addr):
         self.connected = True
 
+    def setsockopt(self, level, optname, value):
+        pass
+
     def send(self, data):
         if not self.connected:
             raise ConnectionError()
         self.sent_data.append(data)
 
+    def sendall(self, data):
+        self.send(data)
+
     def recv(self, size):
         if not self.connected:
             return b''
         return self.received_data.pop(0) if self.received_data else b''
 
+    def recv_into(self, buffer):
+        data = self.recv(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
     def close(self):
         self.closed = True
         self.connected = False
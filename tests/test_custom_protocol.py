@@ -40,6 +40,13 @@ def test_encode_decode_string(protocol):
     assert decoded == original
     assert len(remaining) == 0
 
+def test_iter_strings(protocol):
+    message = protocol.encode_message(CustomWireProtocol.CMD_LIST, ["user1", "online", "user2", "offline"])
+    _, _, _, _, payload = protocol.decode_message(message)
+    assert list(protocol.iter_strings(payload)) == ["user1", "online", "user2", "offline"]
+    # A truncated trailing entry ends iteration instead of yielding garbage
+    assert list(protocol.iter_strings(payload[:-1])) == ["user1", "online", "user2"]
+
 def test_encode_decode_integer_list(protocol):
     original = [1, 2, 3]
     message = protocol.encode_message(CustomWireProtocol.CMD_DELETE_MESSAGES, [original])
@@ -5,17 +5,33 @@ import os
 import sys
 import hashlib
 import time
-import struct
 
 sys.path.insert(0, "src/custom_protocol")
 
 from custom_server import ChatServer
 from custom_protocol import CustomWireProtocol
 
+PROTOCOL = CustomWireProtocol()
+
+# Canonical request frames, encoded once and shared by every test
+FRAMES = {
+    "create_testuser": PROTOCOL.encode_message(CustomWireProtocol.CMD_CREATE, ["testuser", "TestPassword123"]),
+    "login_testuser": PROTOCOL.encode_message(CustomWireProtocol.CMD_LOGIN, ["testuser", "TestPassword123"]),
+    "login_testuser_wrong_password": PROTOCOL.encode_message(CustomWireProtocol.CMD_LOGIN, ["testuser", "WrongPassword"]),
+    "send_recipient_hello": PROTOCOL.encode_message(CustomWireProtocol.CMD_SEND, ["recipient", "Hello!"]),
+    "list_user_prefix": PROTOCOL.encode_message(CustomWireProtocol.CMD_LIST, ["user*"]),
+    "logout": PROTOCOL.encode_message(CustomWireProtocol.CMD_LOGOUT, []),
+    "delete_account_testuser": PROTOCOL.encode_message(CustomWireProtocol.CMD_DELETE_ACCOUNT, ["TestPass123"]),
+    "get_messages_50": PROTOCOL.encode_message(CustomWireProtocol.CMD_GET_MESSAGES, [50]),
+    "delete_messages_1_2_3": PROTOCOL.encode_message(CustomWireProtocol.CMD_DELETE_MESSAGES, [[1, 2, 3]]),
+}
+
 class MockSocket:
     def __init__(self):
-        self.received_data = []
-        self.sent_data = []
+        self._buf = bytearray()
+        self._off = 0
+        self.sent_data = bytearray()
+        self.sent_frames = []  # (offset, length) of each send() into sent_data
         self.bound_address = None
         self.is_listening = False
         self.is_closed = False
@@ -23,16 +39,39 @@ class MockSocket:
     def send(self, data):
         if self.is_closed:
             raise ConnectionError("Socket is closed")
-        self.sent_data.append(data)
+        self.sent_frames.append((len(self.sent_data), len(data)))
+        self.sent_data.extend(data)
+
+    def sendall(self, data):
+        self.send(data)
+
+    def first_frame(self):
+        offset, length = self.sent_frames[0]
+        return memoryview(self.sent_data)[offset:offset + length]
+
+    def reset(self):
+        self._buf.clear()
+        self._off = 0
+        self.sent_data.clear()
+        self.sent_frames.clear()
+        self.is_closed = False
+
+    def feed(self, data):
+        self._buf.extend(data)
 
     def recv(self, buffer_size):
         if self.is_closed:
             return b""
-        return self.received_data.pop(0) if self.received_data else b""
+        chunk = bytes(memoryview(self._buf)[self._off:self._off + buffer_size])
+        self._off += len(chunk)
+        return chunk
 
     def close(self):
         self.is_closed = True
 
+    def shutdown(self, how):
+        pass
+
     def settimeout(self, timeout):
         pass
 
@@ -48,197 +87,159 @@ class MockSocket:
     def accept(self):
         return MockSocket(), ("127.0.0.1", 54321)
 
-@pytest.fixture
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def new_mock_socket(*args, **kwargs):
+    """Stands in for `socket.socket`, returning a fresh MockSocket per call."""
+    return MockSocket()
+
+@pytest.fixture(scope="module")
 def chat_server():
     server = ChatServer(host="127.0.0.1", port=12345)
     yield server
     server.stop()
 
+@pytest.fixture(autouse=True)
+def reset_server_state(chat_server):
+    """Clears the shared server's state so each test starts from an empty server."""
+    chat_server.users.clear()
+    chat_server.active_users.clear()
+    chat_server.messages.clear()
+    chat_server.message_id_counter = 0
+
+@pytest.fixture(scope="module")
+def shared_socket():
+    return MockSocket()
+
 @pytest.fixture
-def wire_protocol():
-    return CustomWireProtocol()
-
-def verify_success_response(mock_socket, wire_protocol):
-    _, _, _, cmd, payload = wire_protocol.decode_message(mock_socket.sent_data[0])
-    success = struct.unpack('!?', payload[:1])[0]
-    return success
-
-def test_create_account(chat_server, wire_protocol, monkeypatch):
-    mock_socket = MockSocket()
-    create_msg = wire_protocol.encode_message(
-        CustomWireProtocol.CMD_CREATE,
-        ["testuser", "TestPassword123"]
-    )
-    mock_socket.received_data.append(create_msg)
-
-    monkeypatch.setattr(socket, "socket", lambda *args, **kwargs: mock_socket)
+def mock_socket(shared_socket):
+    """One MockSocket reused across the module, cleared after each test."""
+    yield shared_socket
+    shared_socket.reset()
+
+@pytest.fixture(scope="session")
+def hashed_passwords():
+    server = ChatServer(host="127.0.0.1", port=12345)
+    return {p: server.hash_password(p) for p in ("TestPassword123",)}
+
+def verify_success_response(mock_socket):
+    # Replies are the fixed header (version, command, total length) followed by the success byte
+    return mock_socket.first_frame()[CustomWireProtocol.HEADER_SIZE] != 0
+
+def test_create_account(chat_server, mock_socket):
+    mock_socket.feed(FRAMES["create_testuser"])
+
     chat_server.handle_client(mock_socket, ("127.0.0.1", 12345))
 
     assert "testuser" in chat_server.users
-    assert verify_success_response(mock_socket, wire_protocol)
+    assert verify_success_response(mock_socket)
 
-def test_login(chat_server, wire_protocol, monkeypatch):
-    mock_socket = MockSocket()
-    chat_server.users["testuser"] = (chat_server.hash_password("TestPassword123"), {})
+def test_login(chat_server, mock_socket, hashed_passwords):
+    chat_server.users["testuser"] = (hashed_passwords["TestPassword123"], {})
     
-    login_msg = wire_protocol.encode_message(
-        CustomWireProtocol.CMD_LOGIN,
-        ["testuser", "TestPassword123"]
-    )
-    mock_socket.received_data.append(login_msg)
+    mock_socket.feed(FRAMES["login_testuser"])
 
-    monkeypatch.setattr(socket, "socket", lambda *args, **kwargs: mock_socket)
     chat_server.handle_client(mock_socket, ("127.0.0.1", 12345))
     
-    assert verify_success_response(mock_socket, wire_protocol)
+    assert verify_success_response(mock_socket)
 
-def test_invalid_login(chat_server, wire_protocol, monkeypatch):
-    mock_socket = MockSocket()
-    chat_server.users["testuser"] = (chat_server.hash_password("TestPassword123"), {})
+def test_invalid_login(chat_server, mock_socket, hashed_passwords):
+    chat_server.users["testuser"] = (hashed_passwords["TestPassword123"], {})
     
-    login_msg = wire_protocol.encode_message(
-        CustomWireProtocol.CMD_LOGIN,
-        ["testuser", "WrongPassword"]
-    )
-    mock_socket.received_data.append(login_msg)
+    mock_socket.feed(FRAMES["login_testuser_wrong_password"])
 
-    monkeypatch.setattr(socket, "socket", lambda *args, **kwargs: mock_socket)
     chat_server.handle_client(mock_socket, ("127.0.0.1", 12345))
     
-    assert not verify_success_response(mock_socket, wire_protocol)
-
-def test_send_message(chat_server, wire_protocol, monkeypatch):
-    mock_socket = MockSocket()
-    sender = "sender"
-    recipient = "recipient"
-    chat_server.users[sender] = (chat_server.hash_password("password"), {})
-    chat_server.users[recipient] = (chat_server.hash_password("password"), {})
-    
-    # Send message
-    send_msg = wire_protocol.encode_message(
-        CustomWireProtocol.CMD_SEND,
-        [recipient, "Hello!"]
-    )
-    mock_socket.received_data.append(send_msg)
-
-    monkeypatch.setattr(socket, "socket", lambda *args, **kwargs: mock_socket)
+    assert not verify_success_response(mock_socket)
+
+def test_handle_client_batched_frames(chat_server, mock_socket, hashed_passwords):
+    chat_server.users["testuser"] = (hashed_passwords["TestPassword123"], {})
+    chat_server.users["recipient"] = (b"", {})
+
+    # Login and send arrive in a single read; the server must drain both frames
+    mock_socket.feed(FRAMES["login_testuser"] + FRAMES["send_recipient_hello"])
     chat_server.handle_client(mock_socket, ("127.0.0.1", 12345))
-    
-    assert not verify_success_response(mock_socket, wire_protocol)  # Should fail because not logged in
 
-def test_list_users(chat_server, wire_protocol, monkeypatch):
-    mock_socket = MockSocket()
+    assert len(mock_socket.sent_frames) == 2
+    assert verify_success_response(mock_socket)
+    assert chat_server.messages["recipient"][0]["content"] == "Hello!"
+
+def test_list_users(chat_server, mock_socket):
     chat_server.users = {
         "user1": ("hash1", {}),
         "user2": ("hash2", {}),
         "admin": ("hash3", {})
     }
     
-    list_msg = wire_protocol.encode_message(
-        CustomWireProtocol.CMD_LIST,
-        ["user*"]
-    )
-    mock_socket.received_data.append(list_msg)
+    mock_socket.feed(FRAMES["list_user_prefix"])
 
-    monkeypatch.setattr(socket, "socket", lambda *args, **kwargs: mock_socket)
     chat_server.handle_client(mock_socket, ("127.0.0.1", 12345))
 
-    assert verify_success_response(mock_socket, wire_protocol)
+    assert verify_success_response(mock_socket)
     matches = chat_server.list_users("user*")
     assert len(matches) == 2
 
-def test_logout(chat_server, wire_protocol, monkeypatch):
-    mock_socket = MockSocket()
-    chat_server.users["testuser"] = (chat_server.hash_password("TestPass123"), {})
-    chat_server.active_users["testuser"] = mock_socket
-    
-    logout_msg = wire_protocol.encode_message(
-        CustomWireProtocol.CMD_LOGOUT,
-        []
-    )
-    mock_socket.received_data.append(logout_msg)
-
-    monkeypatch.setattr(socket, "socket", lambda *args, **kwargs: mock_socket)
-    chat_server.handle_client(mock_socket, ("127.0.0.1", 12345))
-    
-    assert not verify_success_response(mock_socket, wire_protocol)  # Should fail because not logged in
-
-def test_delete_account(chat_server, wire_protocol, monkeypatch):
-    mock_socket = MockSocket()
-    chat_server.users["testuser"] = (chat_server.hash_password("TestPass123"), {})
-    
-    delete_msg = wire_protocol.encode_message(
-        CustomWireProtocol.CMD_DELETE_ACCOUNT,
-        ["TestPass123"]
-    )
-    mock_socket.received_data.append(delete_msg)
-
-    monkeypatch.setattr(socket, "socket", lambda *args, **kwargs: mock_socket)
-    chat_server.handle_client(mock_socket, ("127.0.0.1", 12345))
-    
-    assert not verify_success_response(mock_socket, wire_protocol)  # Should fail because not logged in
-
-def test_get_messages(chat_server, wire_protocol, monkeypatch):
-    mock_socket = MockSocket()
-    
-    get_msg = wire_protocol.encode_message(
-        CustomWireProtocol.CMD_GET_MESSAGES,
-        [50]  # Fetch 50 messages
-    )
-    mock_socket.received_data.append(get_msg)
+@pytest.mark.parametrize("frame_key", [
+    "send_recipient_hello",
+    "logout",
+    "delete_account_testuser",
+    "get_messages_50",
+    "delete_messages_1_2_3",
+])
+def test_requires_login(chat_server, mock_socket, frame_key):
+    # Passwords are never checked on these paths, so skip hashing them
+    chat_server.users["testuser"] = (b"", {})
+    chat_server.users["recipient"] = (b"", {})
+    # Another connection holding the username must not log this one in
+    chat_server.active_users["testuser"] = MockSocket()
+
+    mock_socket.feed(FRAMES[frame_key])
 
-    monkeypatch.setattr(socket, "socket", lambda *args, **kwargs: mock_socket)
     chat_server.handle_client(mock_socket, ("127.0.0.1", 12345))
-    
-    assert not verify_success_response(mock_socket, wire_protocol)  # Should fail because not logged in
 
-def test_delete_messages(chat_server, wire_protocol, monkeypatch):
-    mock_socket = MockSocket()
-    
-    delete_msg = wire_protocol.encode_message(
-        CustomWireProtocol.CMD_DELETE_MESSAGES,
-        [[1, 2, 3]]  # Message IDs to delete
-    )
-    mock_socket.received_data.append(delete_msg)
-
-    monkeypatch.setattr(socket, "socket", lambda *args, **kwargs: mock_socket)
-    chat_server.handle_client(mock_socket, ("127.0.0.1", 12345))
-    
-    assert not verify_success_response(mock_socket, wire_protocol)  # Should fail because not logged in
+    assert not verify_success_response(mock_socket)  # Should fail because not logged in
 
 def test_start_stop(chat_server, monkeypatch):
-    def mock_socket(*args, **kwargs):
-        mock = MockSocket()
-        mock.setsockopt = lambda *args: None
-        mock.bind = lambda *args: None
-        mock.listen = lambda backlog: None
-        return mock
-
-    monkeypatch.setattr(socket, "socket", mock_socket)
+    monkeypatch.setattr(socket, "socket", new_mock_socket)
 
     server_thread = threading.Thread(target=chat_server.start, daemon=True)
     server_thread.start()
-    time.sleep(1)
+    # Wait for the accept loop to come up instead of sleeping a fixed second
+    for _ in range(200):
+        if chat_server.running:
+            break
+        time.sleep(0.005)
 
     assert chat_server.running is True
     chat_server.stop()
-    server_thread.join(timeout=1)
+    assert chat_server.stopped.wait(timeout=1)
     assert chat_server.running is False
-
-def test_validate_password(chat_server):
-    assert not chat_server.validate_password("weak")
-    assert not chat_server.validate_password("12345678")
-    assert not chat_server.validate_password("nocapital1")
-    assert chat_server.validate_password("StrongPass1")
-
-def test_find_free_port(chat_server, monkeypatch):
-    def mock_socket(*args, **kwargs):
-        mock = MockSocket()
-        mock.setsockopt = lambda *args: None
-        mock.bind = lambda *args: None
-        return mock
-
-    monkeypatch.setattr(socket, "socket", mock_socket)
-    port = chat_server.find_free_port(12345)
+    server_thread.join()
+
+@pytest.mark.parametrize("password,valid", [
+    ("weak", False),
+    ("12345678", False),
+    ("nocapital1", False),
+    ("StrongPass1", True),
+])
+def test_validate_password(chat_server, password, valid):
+    assert chat_server.validate_password(password) is valid
+
+def test_find_free_port(chat_server):
+    port = chat_server.find_free_port(0)
     assert isinstance(port, int)
-    assert 1024 <= port <= 65535
\ No newline at end of file
+    assert 1024 <= port <= 65535
+
+def test_find_free_port_in_use(chat_server):
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as taken:
+        taken.bind(("127.0.0.1", 0))
+        taken.listen(1)
+        busy_port = taken.getsockname()[1]
+
+        port = chat_server.find_free_port(busy_port)
+        assert port > busy_port
+        assert 1024 <= port <= 65535
@@ -3,14 +3,55 @@ import grpc
 import sys
 import os
 import time
-import tkinter as tk
-from tkinter import messagebox
-from unittest.mock import MagicMock, patch, PropertyMock
+import threading
+from types import SimpleNamespace
+from unittest.mock import MagicMock, PropertyMock
+
+# grpc_client builds its UI with tkinter, so skip the module where Python lacks Tk.
+tk = pytest.importorskip("tkinter")
+from tkinter import ttk, messagebox
 
 sys.path.insert(0, "src/grpc_protocol")
 import chat_pb2 as chat
 import chat_pb2_grpc as rpc
-from grpc_client import ChatClient
+import grpc_client
+from grpc_client import ChatClient, main
+
+# Canned server replies, built once and shared by every test. The client only
+# reads .error and .message from a plain Reply, so those are SimpleNamespaces;
+# list replies stay real protobufs since the client iterates their fields.
+REPLIES = {
+    "account_created": SimpleNamespace(error=False, message="Account created successfully"),
+    "login_ok": SimpleNamespace(error=False, message="Login successful. You have 2 unread messages."),
+    "login_bad_password": SimpleNamespace(error=True, message="Invalid password"),
+    "message_sent": SimpleNamespace(error=False, message="Message sent"),
+    "account_deleted": SimpleNamespace(error=False, message="Account deleted"),
+    "logged_out": SimpleNamespace(error=False, message="Logged out successfully"),
+    "messages_deleted": SimpleNamespace(error=False, message="Messages deleted"),
+    "read_messages": chat.MessageList(error=False, messages=[
+        chat.Message(id=1, username="sender", to="testuser", content="Hello", timestamp=1, read=True),
+        chat.Message(id=2, username="sender", to="testuser", content="World", timestamp=2, read=True),
+    ]),
+    "unread_messages": chat.MessageList(error=False, messages=[
+        chat.Message(id=1, username="sender", to="testuser", content="Hello", timestamp=1, read=False),
+        chat.Message(id=2, username="sender", to="testuser", content="World", timestamp=2, read=False),
+    ]),
+    "two_users": chat.UserList(error=False, message="Found 2 users", users=[
+        chat.User(username="user1", status="online"),
+        chat.User(username="user2", status="offline"),
+    ]),
+}
+
+# A message pushed by the server over ChatStream
+INCOMING_MESSAGE = chat.Message(
+    id=1,
+    username="sender",
+    to="testuser",
+    content="Hello, world!",
+    timestamp=123456789,
+    read=False,
+    delivered_while_offline=False
+)
 
 class MockStub:
     """Mock for the gRPC stub to simulate server interactions."""
@@ -26,44 +67,91 @@ class MockStub:
         self.SendLogout = MagicMock()
         self.ChatStream = MagicMock()
 
-@pytest.fixture
-def chat_client():
-    """Fixture to create a ChatClient instance with mocked gRPC connections."""
-    with patch('tkinter.Tk'), \
-         patch('grpc.insecure_channel') as mock_channel, \
-         patch('grpc.channel_ready_future') as mock_future:
-        
+    def reset_mock(self):
+        """Clears recorded calls and any per-test return values or side effects."""
+        for method in vars(self).values():
+            method.reset_mock(return_value=True, side_effect=True)
+
+# Widgets and Tk variables replaced with mocks on the shared client. Each mock
+# is specced on the real widget class so a misspelt method fails the test;
+# messages_frame stays unspecced because MessageFrame uses it as a Tk master.
+UI_SPECS = {
+    "root": tk.Tk,
+    "username_entry": ttk.Entry,
+    "password_entry": ttk.Entry,
+    "recipient_var": tk.StringVar,
+    "message_text": tk.Text,
+    "msg_count": ttk.Entry,
+    "delete_password": ttk.Entry,
+    "search_var": tk.StringVar,
+    "messages_frame": None,
+    "accounts_list": ttk.Treeview,
+    "notebook": ttk.Notebook,
+    "status_var": tk.StringVar,
+    "user_count_var": tk.StringVar,
+    "online_count_var": tk.StringVar,
+}
+
+@pytest.fixture(scope="module")
+def shared_chat_client():
+    """Builds one ChatClient with mocked gRPC connections for the whole module."""
+    # monkeypatch is function-scoped, so open a module-lifetime context instead
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(tk, "Tk", MagicMock())
+        mp.setattr(grpc, "insecure_channel", MagicMock())
         # Mock the channel's readiness
-        mock_future.return_value = MagicMock()
+        mp.setattr(grpc, "channel_ready_future", MagicMock())
         
         # Create client and inject a mock stub
         client = ChatClient("127.0.0.1", 12345)
         client.stub = MockStub()
-        client.root = MagicMock()
-        client.running = True
         
         # Mock the UI elements
-        client.username_entry = MagicMock()
-        client.password_entry = MagicMock()
-        client.recipient_var = MagicMock()
-        client.message_text = MagicMock()
-        client.msg_count = MagicMock()
-        client.delete_password = MagicMock()
-        client.search_var = MagicMock()
-        client.messages_frame = MagicMock()
-        client.accounts_list = MagicMock()
-        client.notebook = MagicMock()
-        client.status_var = MagicMock()
-        client.user_count_var = MagicMock()
-        client.online_count_var = MagicMock()
+        for name, spec in UI_SPECS.items():
+            setattr(client, name, MagicMock(spec=spec))
         
-        # Mock messagebox to prevent UI dialogs
-        with patch('tkinter.messagebox.showinfo'), \
-             patch('tkinter.messagebox.showerror'), \
-             patch('tkinter.messagebox.showwarning'), \
-             patch('tkinter.messagebox.askyesno', return_value=True):
-            
-            yield client
+        yield client
+
+@pytest.fixture
+def chat_client(shared_chat_client):
+    """Resets the shared ChatClient to a logged-out, running state for each test."""
+    client = shared_chat_client
+    client.stub.reset_mock()
+    client.channel.reset_mock()
+    for name in UI_SPECS:
+        getattr(client, name).reset_mock(return_value=True, side_effect=True)
+    client.username = None
+    client.running = True
+    return client
+
+@pytest.fixture(autouse=True)
+def dialogs(monkeypatch):
+    """Replaces the tkinter message boxes so no test opens a real dialog.
+
+    Confirmation prompts answer yes unless a test sets askyesno.return_value.
+    """
+    mocks = SimpleNamespace(
+        showinfo=MagicMock(),
+        showerror=MagicMock(),
+        showwarning=MagicMock(),
+        askyesno=MagicMock(return_value=True),
+    )
+    for name, mock in vars(mocks).items():
+        monkeypatch.setattr(messagebox, name, mock)
+    return mocks
+
+def assert_single_call(mock):
+    """Asserts a stub was called exactly once and returns its request argument.
+
+    Args:
+        mock (MagicMock): The stub method to check.
+
+    Returns:
+        The first positional argument of the single recorded call.
+    """
+    calls = mock.call_args_list
+    assert len(calls) == 1
+    return calls[0].args[0]
 
 def test_chat_client_initialization(chat_client):
     """Test the initialization of the ChatClient class."""
@@ -75,10 +163,7 @@ def test_chat_client_initialization(chat_client):
 def test_create_account(chat_client):
     """Test the create_account method."""
     # Setup return value for the stub method
-    chat_client.stub.SendCreateAccount.return_value = chat.Reply(
-        error=False, 
-        message="Account created successfully"
-    )
+    chat_client.stub.SendCreateAccount.return_value = REPLIES["account_created"]
     
     # Setup mock values
     chat_client.username_entry.get.return_value = "testuser"
@@ -88,31 +173,47 @@ def test_create_account(chat_client):
     chat_client.create_account()
     
     # Verify the stub was called with correct parameters
-    chat_client.stub.SendCreateAccount.assert_called_once()
-    args = chat_client.stub.SendCreateAccount.call_args[0][0]
+    args = assert_single_call(chat_client.stub.SendCreateAccount)
     assert args.username == "testuser"
     assert args.password == "TestPassword123"
 
-def test_create_account_empty_fields(chat_client):
-    """Test create_account with empty fields."""
-    chat_client.username_entry.get.return_value = ""
-    chat_client.password_entry.get.return_value = ""
-    
-    with patch('tkinter.messagebox.showwarning') as mock_warning:
-        chat_client.create_account()
-        mock_warning.assert_called_once()
-        assert "enter username and password" in mock_warning.call_args[0][1].lower()
+@pytest.mark.parametrize("method,stub_method,username,inputs,expected_warning", [
+    ("create_account", "SendCreateAccount", None, {"username_entry": "", "password_entry": ""}, "enter username and password"),
+    ("login", "SendLogin", None, {"username_entry": "", "password_entry": ""}, "enter username and password"),
+    ("send_message", "SendMessage", None, {}, "login first"),
+    ("send_message", "SendMessage", "testuser", {"recipient_var": "", "message_text": ""}, "enter recipient and message"),
+    ("refresh_messages", "SendGetMessages", None, {}, "login first"),
+    ("delete_account", "SendDeleteAccount", None, {}, "login first"),
+    ("delete_account", "SendDeleteAccount", "testuser", {"delete_password": ""}, "enter your password"),
+    ("logout", "SendLogout", None, {}, "not logged in"),
+], ids=[
+    "create_account_empty_fields",
+    "login_empty_fields",
+    "send_message_not_logged_in",
+    "send_message_empty_fields",
+    "refresh_messages_not_logged_in",
+    "delete_account_not_logged_in",
+    "delete_account_empty_password",
+    "logout_not_logged_in",
+])
+def test_warns_without_calling_server(chat_client, dialogs, method, stub_method, username, inputs, expected_warning):
+    """Test that missing input or login shows a warning and never reaches the server."""
+    # Setup client state and empty form fields
+    chat_client.username = username
+    for widget, value in inputs.items():
+        getattr(chat_client, widget).get.return_value = value
+    
+    getattr(chat_client, method)()
+    dialogs.showwarning.assert_called_once()
+    assert expected_warning in dialogs.showwarning.call_args[0][1].lower()
     
     # Verify stub was not called
-    chat_client.stub.SendCreateAccount.assert_not_called()
+    assert not getattr(chat_client.stub, stub_method).called
 
 def test_login(chat_client):
     """Test the login method."""
     # Setup return value for the stub method
-    chat_client.stub.SendLogin.return_value = chat.Reply(
-        error=False, 
-        message="Login successful. You have 2 unread messages."
-    )
+    chat_client.stub.SendLogin.return_value = REPLIES["login_ok"]
     
     # Setup mock values
     chat_client.username_entry.get.return_value = "testuser"
@@ -122,8 +223,7 @@ def test_login(chat_client):
     chat_client.login()
     
     # Verify the stub was called with correct parameters
-    chat_client.stub.SendLogin.assert_called_once()
-    args = chat_client.stub.SendLogin.call_args[0][0]
+    args = assert_single_call(chat_client.stub.SendLogin)
     assert args.username == "testuser"
     assert args.password == "TestPassword123"
     
@@ -132,35 +232,18 @@ def test_login(chat_client):
     chat_client.status_var.set.assert_called_once()
     chat_client.notebook.select.assert_called_once()
 
-def test_login_empty_fields(chat_client):
-    """Test login with empty fields."""
-    chat_client.username_entry.get.return_value = ""
-    chat_client.password_entry.get.return_value = ""
-    
-    with patch('tkinter.messagebox.showwarning') as mock_warning:
-        chat_client.login()
-        mock_warning.assert_called_once()
-        assert "enter username and password" in mock_warning.call_args[0][1].lower()
-    
-    # Verify stub was not called
-    chat_client.stub.SendLogin.assert_not_called()
-
-def test_login_error(chat_client):
+def test_login_error(chat_client, dialogs):
     """Test login with server error response."""
     # Setup error return value
-    chat_client.stub.SendLogin.return_value = chat.Reply(
-        error=True, 
-        message="Invalid password"
-    )
+    chat_client.stub.SendLogin.return_value = REPLIES["login_bad_password"]
     
     # Setup mock values
     chat_client.username_entry.get.return_value = "testuser"
     chat_client.password_entry.get.return_value = "WrongPassword"
     
-    with patch('tkinter.messagebox.showerror') as mock_error:
-        chat_client.login()
-        mock_error.assert_called_once()
-        assert "Invalid password" in mock_error.call_args[0][1]
+    chat_client.login()
+    dialogs.showerror.assert_called_once()
+    assert "Invalid password" in dialogs.showerror.call_args[0][1]
     
     # Verify username was not set
     assert chat_client.username is None
@@ -171,10 +254,7 @@ def test_send_message(chat_client):
     chat_client.username = "testuser"
     
     # Setup return value for the stub method
-    chat_client.stub.SendMessage.return_value = chat.Reply(
-        error=False, 
-        message="Message sent"
-    )
+    chat_client.stub.SendMessage.return_value = REPLIES["message_sent"]
     
     # Setup mock values
     chat_client.recipient_var.get.return_value = "recipient"
@@ -184,8 +264,7 @@ def test_send_message(chat_client):
     chat_client.send_message()
     
     # Verify the stub was called with correct parameters
-    chat_client.stub.SendMessage.assert_called_once()
-    args = chat_client.stub.SendMessage.call_args[0][0]
+    args = assert_single_call(chat_client.stub.SendMessage)
     assert args.username == "testuser"
     assert args.to == "recipient"
     assert args.content == "Hello, world!"
@@ -193,107 +272,26 @@ def test_send_message(chat_client):
     # Verify text field was cleared
     chat_client.message_text.delete.assert_called_once()
 
-def test_send_message_not_logged_in(chat_client):
-    """Test send_message when not logged in."""
-    # Setup client state
-    chat_client.username = None
-    
-    with patch('tkinter.messagebox.showwarning') as mock_warning:
-        chat_client.send_message()
-        mock_warning.assert_called_once()
-        assert "login first" in mock_warning.call_args[0][1].lower()
-    
-    # Verify stub was not called
-    chat_client.stub.SendMessage.assert_not_called()
-
-def test_send_message_empty_fields(chat_client):
-    """Test send_message with empty fields."""
-    # Setup client state
-    chat_client.username = "testuser"
-    
-    # Setup mock values for empty fields
-    chat_client.recipient_var.get.return_value = ""
-    chat_client.message_text.get.return_value = ""
-    
-    with patch('tkinter.messagebox.showwarning') as mock_warning:
-        chat_client.send_message()
-        mock_warning.assert_called_once()
-        assert "enter recipient and message" in mock_warning.call_args[0][1].lower()
-    
-    # Verify stub was not called
-    chat_client.stub.SendMessage.assert_not_called()
-
-def test_refresh_messages(chat_client):
-    """Test the refresh_messages method."""
+@pytest.mark.parametrize("method,stub_method,reply", [
+    ("refresh_messages", "SendGetMessages", "read_messages"),
+    ("refresh_unread_messages", "SendGetUndelivered", "unread_messages"),
+], ids=["refresh_messages", "refresh_unread_messages"])
+def test_refresh(chat_client, method, stub_method, reply):
+    """Test the refresh_messages and refresh_unread_messages methods."""
     # Setup client state
     chat_client.username = "testuser"
     
     # Setup mock values
     chat_client.msg_count.get.return_value = "10"
     
-    # Setup mock messages
-    mock_messages = [
-        chat.Message(id=1, username="sender", to="testuser", content="Hello", timestamp=1, read=True),
-        chat.Message(id=2, username="sender", to="testuser", content="World", timestamp=2, read=True)
-    ]
-    
     # Setup return value for the stub method
-    chat_client.stub.SendGetMessages.return_value = chat.MessageList(
-        error=False,
-        messages=mock_messages
-    )
+    getattr(chat_client.stub, stub_method).return_value = REPLIES[reply]
     
     # Call the method
-    chat_client.refresh_messages()
+    getattr(chat_client, method)()
     
     # Verify the stub was called with correct parameters
-    chat_client.stub.SendGetMessages.assert_called_once()
-    args = chat_client.stub.SendGetMessages.call_args[0][0]
-    assert args.username == "testuser"
-    assert args.count == 10
-    
-    # Verify messages were cleared and processed
-    chat_client.clear_messages.assert_called_once()
-
-def test_refresh_messages_not_logged_in(chat_client):
-    """Test refresh_messages when not logged in."""
-    # Setup client state
-    chat_client.username = None
-    
-    with patch('tkinter.messagebox.showwarning') as mock_warning:
-        chat_client.refresh_messages()
-        mock_warning.assert_called_once()
-        assert "login first" in mock_warning.call_args[0][1].lower()
-    
-    # Verify stub was not called
-    chat_client.stub.SendGetMessages.assert_not_called()
-
-def test_refresh_unread_messages(chat_client):
-    """Test the refresh_unread_messages method."""
-    # Setup client state
-    chat_client.username = "testuser"
-    
-    # Setup mock values
-    chat_client.msg_count.get.return_value = "10"
-    
-    # Setup mock messages
-    mock_messages = [
-        chat.Message(id=1, username="sender", to="testuser", content="Hello", timestamp=1, read=False),
-        chat.Message(id=2, username="sender", to="testuser", content="World", timestamp=2, read=False)
-    ]
-    
-    # Setup return value for the stub method
-    chat_client.stub.SendGetUndelivered.return_value = chat.MessageList(
-        error=False,
-        messages=mock_messages
-    )
-    
-    # Call the method
-    chat_client.refresh_unread_messages()
-    
-    # Verify the stub was called with correct parameters
-    chat_client.stub.SendGetUndelivered.assert_called_once()
-    args = chat_client.stub.SendGetUndelivered.call_args[0][0]
+    args = assert_single_call(getattr(chat_client.stub, stub_method))
     assert args.username == "testuser"
     assert args.count == 10
     
@@ -303,16 +301,7 @@ def test_refresh_unread_messages(chat_client):
 def test_search_accounts(chat_client):
     """Test the search_accounts method."""
     # Setup return value for the stub method
-    mock_users = [
-        chat.User(username="user1", status="online"),
-        chat.User(username="user2", status="offline")
-    ]
-    
-    chat_client.stub.SendListAccounts.return_value = chat.UserList(
-        error=False,
-        message="Found 2 users",
-        users=mock_users
-    )
+    chat_client.stub.SendListAccounts.return_value = REPLIES["two_users"]
     
     # Setup mock values
     chat_client.search_var.get.return_value = "user"
@@ -321,8 +310,7 @@ def test_search_accounts(chat_client):
     chat_client.search_accounts()
     
     # Verify the stub was called with correct parameters
-    chat_client.stub.SendListAccounts.assert_called_once()
-    args = chat_client.stub.SendListAccounts.call_args[0][0]
+    args = assert_single_call(chat_client.stub.SendListAccounts)
     assert args.wildcard == "user*"
     
     # Verify that user list was updated
@@ -357,20 +345,15 @@ def test_delete_account(chat_client):
     chat_client.username = "testuser"
     
     # Setup return value for the stub method
-    chat_client.stub.SendDeleteAccount.return_value = chat.Reply(
-        error=False, 
-        message="Account deleted"
-    )
+    chat_client.stub.SendDeleteAccount.return_value = REPLIES["account_deleted"]
     
     # Setup mock values
     chat_client.delete_password.get.return_value = "TestPassword123"
     
-    with patch('tkinter.messagebox.askyesno', return_value=True):
-        chat_client.delete_account()
+    chat_client.delete_account()
     
     # Verify the stub was called with correct parameters
-    chat_client.stub.SendDeleteAccount.assert_called_once()
-    args = chat_client.stub.SendDeleteAccount.call_args[0][0]
+    args = assert_single_call(chat_client.stub.SendDeleteAccount)
     assert args.username == "testuser"
     assert args.password == "TestPassword123"
     
@@ -380,36 +363,7 @@ def test_delete_account(chat_client):
     chat_client.notebook.select.assert_called_once()
     chat_client.clear_messages.assert_called_once()
 
-def test_delete_account_not_logged_in(chat_client):
-    """Test delete_account when not logged in."""
-    # Setup client state
-    chat_client.username = None
-    
-    with patch('tkinter.messagebox.showwarning') as mock_warning:
-        chat_client.delete_account()
-        mock_warning.assert_called_once()
-        assert "login first" in mock_warning.call_args[0][1].lower()
-    
-    # Verify stub was not called
-    chat_client.stub.SendDeleteAccount.assert_not_called()
-
-def test_delete_account_empty_password(chat_client):
-    """Test delete_account with empty password."""
-    # Setup client state
-    chat_client.username = "testuser"
-    
-    # Setup mock values
-    chat_client.delete_password.get.return_value = ""
-    
-    with patch('tkinter.messagebox.showwarning') as mock_warning:
-        chat_client.delete_account()
-        mock_warning.assert_called_once()
-        assert "enter your password" in mock_warning.call_args[0][1].lower()
-    
-    # Verify stub was not called
-    chat_client.stub.SendDeleteAccount.assert_not_called()
-
-def test_delete_account_canceled(chat_client):
+def test_delete_account_canceled(chat_client, dialogs):
     """Test delete_account when user cancels."""
     # Setup client state
     chat_client.username = "testuser"
@@ -417,11 +371,11 @@ def test_delete_account_canceled(chat_client):
     # Setup mock values
     chat_client.delete_password.get.return_value = "TestPassword123"
     
-    with patch('tkinter.messagebox.askyesno', return_value=False):
-        chat_client.delete_account()
+    dialogs.askyesno.return_value = False
+    chat_client.delete_account()
     
     # Verify stub was not called
-    chat_client.stub.SendDeleteAccount.assert_not_called()
+    assert not chat_client.stub.SendDeleteAccount.called
 
 def test_logout(chat_client):
     """Test the logout method."""
@@ -429,17 +383,13 @@ def test_logout(chat_client):
     chat_client.username = "testuser"
     
     # Setup return value for the stub method
-    chat_client.stub.SendLogout.return_value = chat.Reply(
-        error=False, 
-        message="Logged out successfully"
-    )
+    chat_client.stub.SendLogout.return_value = REPLIES["logged_out"]
     
     # Call the method
     chat_client.logout()
     
     # Verify the stub was called with correct parameters
-    chat_client.stub.SendLogout.assert_called_once()
-    args = chat_client.stub.SendLogout.call_args[0][0]
+    args = assert_single_call(chat_client.stub.SendLogout)
     assert args.username == "testuser"
     
     # Verify client state was updated
@@ -448,29 +398,13 @@ def test_logout(chat_client):
     chat_client.notebook.select.assert_called_once()
     chat_client.clear_messages.assert_called_once()
 
-def test_logout_not_logged_in(chat_client):
-    """Test logout when not logged in."""
-    # Setup client state
-    chat_client.username = None
-    
-    with patch('tkinter.messagebox.showwarning') as mock_warning:
-        chat_client.logout()
-        mock_warning.assert_called_once()
-        assert "not logged in" in mock_warning.call_args[0][1].lower()
-    
-    # Verify stub was not called
-    chat_client.stub.SendLogout.assert_not_called()
-
 def test_delete_message(chat_client):
     """Test the delete_message method."""
     # Setup client state
     chat_client.username = "testuser"
     
     # Setup return value for the stub method
-    chat_client.stub.SendDeleteMessages.return_value = chat.Reply(
-        error=False, 
-        message="Messages deleted"
-    )
+    chat_client.stub.SendDeleteMessages.return_value = REPLIES["messages_deleted"]
     
     # Mock MessageFrame for testing removal
     class MockMessageFrame:
@@ -483,12 +417,10 @@ def test_delete_message(chat_client):
     msg_frame2 = MockMessageFrame(2)
     chat_client.messages_frame.winfo_children.return_value = [msg_frame1, msg_frame2]
     
-    with patch('tkinter.messagebox.askyesno', return_value=True):
-        chat_client.delete_message(1)
+    chat_client.delete_message(1)
     
     # Verify the stub was called with correct parameters
-    chat_client.stub.SendDeleteMessages.assert_called_once()
-    args = chat_client.stub.SendDeleteMessages.call_args[0][0]
+    args = assert_single_call(chat_client.stub.SendDeleteMessages)
     assert args.username == "testuser"
     assert list(args.message_ids) == [1]
     
@@ -496,16 +428,16 @@ def test_delete_message(chat_client):
     msg_frame1.destroy.assert_called_once()
     msg_frame2.destroy.assert_not_called()
 
-def test_delete_message_canceled(chat_client):
+def test_delete_message_canceled(chat_client, dialogs):
     """Test delete_message when user cancels."""
     # Setup client state
     chat_client.username = "testuser"
     
-    with patch('tkinter.messagebox.askyesno', return_value=False):
-        chat_client.delete_message(1)
+    dialogs.askyesno.return_value = False
+    chat_client.delete_message(1)
     
     # Verify stub was not called
-    chat_client.stub.SendDeleteMessages.assert_not_called()
+    assert not chat_client.stub.SendDeleteMessages.called
 
 def test_delete_selected_messages(chat_client):
     """Test the delete_selected_messages method."""
@@ -513,10 +445,7 @@ def test_delete_selected_messages(chat_client):
     chat_client.username = "testuser"
     
     # Setup return value for the stub method
-    chat_client.stub.SendDeleteMessages.return_value = chat.Reply(
-        error=False, 
-        message="Messages deleted"
-    )
+    chat_client.stub.SendDeleteMessages.return_value = REPLIES["messages_deleted"]
     
     # Mock MessageFrames with selection variables
     class MockMessageFrame:
@@ -532,12 +461,10 @@ def test_delete_selected_messages(chat_client):
     msg_frame3 = MockMessageFrame(3, True)  # Selected
     chat_client.messages_frame.winfo_children.return_value = [msg_frame1, msg_frame2, msg_frame3]
     
-    with patch('tkinter.messagebox.askyesno', return_value=True):
-        chat_client.delete_selected_messages()
+    chat_client.delete_selected_messages()
     
     # Verify the stub was called with correct parameters
-    chat_client.stub.SendDeleteMessages.assert_called_once()
-    args = chat_client.stub.SendDeleteMessages.call_args[0][0]
+    args = assert_single_call(chat_client.stub.SendDeleteMessages)
     assert args.username == "testuser"
     assert sorted(list(args.message_ids)) == [1, 3]
     
@@ -568,7 +495,7 @@ def test_delete_selected_messages_none_selected(chat_client):
     chat_client.delete_selected_messages()
     
     # Verify stub was not called
-    chat_client.stub.SendDeleteMessages.assert_not_called()
+    assert not chat_client.stub.SendDeleteMessages.called
 
 def test_clear_messages(chat_client):
     """Test the clear_messages method."""
@@ -584,25 +511,13 @@ def test_clear_messages(chat_client):
     msg_frame1.destroy.assert_called_once()
     msg_frame2.destroy.assert_called_once()
 
-def test_handle_incoming_message(chat_client):
+def test_handle_incoming_message(chat_client, dialogs):
     """Test handling incoming messages from the stream."""
-    # Create a mock message
-    message = chat.Message(
-        id=1,
-        username="sender",
-        to="testuser",
-        content="Hello, world!",
-        timestamp=123456789,
-        read=False,
-        delivered_while_offline=False
-    )
-    
     # Call the method
-    with patch('tkinter.messagebox.showinfo') as mock_info:
-        chat_client.handle_incoming_message(message)
-        mock_info.assert_called_once()
-        assert "New message" in mock_info.call_args[0][0]
-        assert "sender" in mock_info.call_args[0][1]
+    chat_client.handle_incoming_message(INCOMING_MESSAGE)
+    dialogs.showinfo.assert_called_once()
+    assert "New message" in dialogs.showinfo.call_args[0][0]
+    assert "sender" in dialogs.showinfo.call_args[0][1]
 
 def test_on_closing(chat_client):
     """Test the on_closing method."""
@@ -623,16 +538,15 @@ def test_on_closing(chat_client):
     chat_client.channel.close.assert_called_once()
     chat_client.root.destroy.assert_called_once()
 
-def test_on_connection_lost(chat_client):
+def test_on_connection_lost(chat_client, dialogs):
     """Test the on_connection_lost method."""
     # Setup client state
     chat_client.running = True
     
     # Call the method
-    with patch('tkinter.messagebox.showerror') as mock_error:
-        chat_client.on_connection_lost()
-        mock_error.assert_called_once()
-        assert "Connection to server lost" in mock_error.call_args[0][1]
+    chat_client.on_connection_lost()
+    dialogs.showerror.assert_called_once()
+    assert "Connection to server lost" in dialogs.showerror.call_args[0][1]
     
     # Verify client state was updated
     assert chat_client.running is False
@@ -640,8 +554,11 @@ def test_on_connection_lost(chat_client):
     # Verify window was destroyed
     chat_client.root.destroy.assert_called_once()
 
-def test_entry_request_iterator(chat_client):
+def test_entry_request_iterator(chat_client, monkeypatch):
     """Test the entry_request_iterator method."""
+    # Skip the iterator's throttle so stopping takes effect immediately
+    monkeypatch.setattr(time, "sleep", lambda seconds: None)
+    
     # Setup client state
     chat_client.username = "testuser"
     chat_client.running = True
@@ -660,46 +577,39 @@ def test_entry_request_iterator(chat_client):
     
     # Make sure we don't get any more items
     with pytest.raises(StopIteration):
-        # Sleep a bit to ensure iteration stops
-        time.sleep(0.6)
         next(iterator)
 
-def test_start_message_stream(chat_client):
+def test_start_message_stream(chat_client, monkeypatch):
     """Test the start_message_stream method."""
     # Setup client state
     chat_client.username = "testuser"
     chat_client.running = True
     
-    # Mock the stream responses
-    mock_message = chat.Message(
-        id=1,
-        username="sender",
-        to="testuser",
-        content="Hello",
-        timestamp=time.time(),
-        read=False,
-        delivered_while_offline=False
-    )
-    
     # Setup the ChatStream stub method to return an iterable of messages
-    chat_client.stub.ChatStream.return_value = [mock_message]
-    
-    # Patch handle_incoming_message to check it's called
-    with patch.object(chat_client, 'handle_incoming_message') as mock_handler:
-        # Call the method in a thread so we can stop it
-        thread = threading.Thread(target=chat_client.start_message_stream)
-        thread.daemon = True
-        thread.start()
-        
-        # Allow time for the message to be processed
-        time.sleep(0.5)
-        
-        # Stop the thread
-        chat_client.running = False
-        thread.join(timeout=1)
-        
-        # Verify the message handler was called
-        chat_client.root.after.assert_called()
+    chat_client.stub.ChatStream.return_value = [INCOMING_MESSAGE]
+    
+    # Signal as soon as the stream hands the message to the UI thread
+    dispatched = threading.Event()
+    chat_client.root.after.side_effect = lambda *args: dispatched.set()
+    
+    # Patch handle_incoming_message to check it's scheduled
+    mock_handler = MagicMock()
+    monkeypatch.setattr(ChatClient, 'handle_incoming_message', mock_handler)
+    
+    # Call the method in a thread so we can stop it
+    thread = threading.Thread(target=chat_client.start_message_stream)
+    thread.daemon = True
+    thread.start()
+    
+    # Wait for the message to be processed
+    assert dispatched.wait(timeout=2)
+    
+    # Stop the thread
+    chat_client.running = False
+    thread.join(timeout=1)
+    
+    # Verify the message handler was scheduled on the UI thread
+    chat_client.root.after.assert_called_with(0, mock_handler, INCOMING_MESSAGE)
 
 def test_start_message_stream_error_handling(chat_client):
     """Test error handling in start_message_stream."""
@@ -710,21 +620,24 @@ def test_start_message_stream_error_handling(chat_client):
     # Setup the ChatStream stub method to raise an exception
     chat_client.stub.ChatStream.side_effect = grpc.RpcError("Test error")
     
+    # Signal as soon as the error is handed to the UI thread
+    reported = threading.Event()
+    chat_client.root.after.side_effect = lambda *args: reported.set()
+    
     # Call the method in a thread so we can stop it
-    with patch('tkinter.messagebox.showerror') as mock_error:
-        thread = threading.Thread(target=chat_client.start_message_stream)
-        thread.daemon = True
-        thread.start()
-        
-        # Allow time for the error to be processed
-        time.sleep(0.5)
-        
-        # Stop the thread
-        chat_client.running = False
-        thread.join(timeout=1)
-        
-        # Verify error handling
-        chat_client.root.after.assert_called()
+    thread = threading.Thread(target=chat_client.start_message_stream)
+    thread.daemon = True
+    thread.start()
+    
+    # Wait for the error to be processed
+    assert reported.wait(timeout=2)
+    
+    # Stop the thread
+    chat_client.running = False
+    thread.join(timeout=1)
+    
+    # Verify error handling
+    chat_client.root.after.assert_called()
 
 def test_run(chat_client):
     """Test the run method."""
@@ -780,30 +693,20 @@ def test_check_users_periodically(chat_client):
     # Verify it doesn't schedule itself again
     chat_client.root.after.assert_not_called()
 
-def test_main():
+def test_main(monkeypatch):
     """Test the main function."""
-    # Mock command-line arguments
-    test_args = ["grpc_client.py", "localhost", "--port", "50051"]
+    # Mock command-line arguments; argparse parses them for real
+    monkeypatch.setattr(sys, "argv", ["grpc_client.py", "localhost", "--port", "50051"])
     
-    with patch('sys.argv', test_args), \
-         patch('argparse.ArgumentParser.parse_args') as mock_args, \
-         patch('grpc_client.ChatClient') as mock_client:
-        
-        # Configure mock args
-        mock_args.return_value = MagicMock(host="localhost", port=50051)
-        
-        # Mock client instance
-        mock_client_instance = MagicMock()
-        mock_client.return_value = mock_client_instance
-        
-        # Import main function
-        from grpc_client import main
-        
-        # Call main
-        main()
-        
-        # Verify ChatClient was created with correct parameters
-        mock_client.assert_called_once_with("localhost", 50051)
-        
-        # Verify run was called
-        mock_client_instance.run.assert_called_once()
\ No newline at end of file
+    # Mock client instance
+    mock_client = MagicMock()
+    monkeypatch.setattr(grpc_client, "ChatClient", mock_client)
+    
+    # Call main
+    main()
+    
+    # Verify ChatClient was created with correct parameters
+    mock_client.assert_called_once_with("localhost", 50051)
+    
+    # Verify run was called
+    mock_client.return_value.run.assert_called_once()
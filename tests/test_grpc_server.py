@@ -1,9 +1,10 @@
 import pytest
 import grpc
-import threading
 import os
 import sys
 import hashlib
+import hmac
+import itertools
 import time
 from unittest.mock import MagicMock, patch
 
@@ -12,6 +13,38 @@ sys.path.insert(0, "src/grpc_protocol")
 import chat_pb2 as chat
 import chat_pb2_grpc as rpc
 from grpc_server import ChatServer, serve
+from server_utils import glob_matcher
+
+# Canonical requests, built once and shared by every test (the server only reads them)
+REQUESTS = {
+    "create_testuser": chat.CreateAccount(username="testuser", password="TestPassword123"),
+    "create_weak_password": chat.CreateAccount(username="newuser", password="weak"),
+    "login_testuser": chat.Login(username="testuser", password="TestPassword123"),
+    "login_wrong_password": chat.Login(username="testuser", password="WrongPassword123"),
+    "login_nonexistent": chat.Login(username="nonexistent", password="TestPassword123"),
+    "logout_testuser": chat.Logout(username="testuser"),
+    "delete_account_wrong_password": chat.DeleteAccount(username="testuser", password="WrongPassword"),
+    "delete_account_testuser": chat.DeleteAccount(username="testuser", password="TestPassword123"),
+    "message_to_recipient": chat.Message(username="sender", to="recipient", content="Hello, world!"),
+    "message_to_nonexistent": chat.Message(username="sender", to="nonexistent", content="Hello"),
+    "get_messages_10": chat.GetMessages(username="testuser", count=10),
+    "get_undelivered_10": chat.GetUndelivered(username="testuser", count=10),
+    "delete_messages_1_3": chat.DeleteMessages(username="testuser", message_ids=[1, 3]),
+    "delete_messages_2": chat.DeleteMessages(username="testuser", message_ids=[2]),
+    "list_all": chat.ListAccounts(username="user1", wildcard="*"),
+    "list_user_prefix": chat.ListAccounts(username="user1", wildcard="user*"),
+    "stream_id_testuser": chat.Id(username="testuser"),
+}
+
+# Canonical inbox for "testuser": two read messages followed by one unread
+MESSAGE_TEMPLATE = [
+    {"id": 1, "from": "sender", "to": "testuser", "content": "Message1",
+     "timestamp": 1, "read": True, "delivered_while_offline": False},
+    {"id": 2, "from": "sender", "to": "testuser", "content": "Message2",
+     "timestamp": 2, "read": True, "delivered_while_offline": False},
+    {"id": 3, "from": "sender", "to": "testuser", "content": "Message3",
+     "timestamp": 3, "read": False, "delivered_while_offline": False},
+]
 
 class MockContext:
     """Mock gRPC context for testing."""
@@ -29,52 +62,71 @@ class MockContext:
     def cancel(self):
         self.cancelled = True
 
-class MockRequestIterator:
-    """Mock request iterator for testing stream functionality."""
-    def __init__(self, requests):
-        self.requests = requests
-        self.index = 0
-        
-    def __iter__(self):
-        return self
-        
-    def __next__(self):
-        if self.index < len(self.requests):
-            request = self.requests[self.index]
-            self.index += 1
-            return request
-        raise StopIteration
-
 @pytest.fixture
 def chat_server():
     """Fixture to create a ChatServer instance."""
     server = ChatServer()
     yield server
 
+@pytest.fixture(scope="session")
+def shared_context():
+    return MockContext()
+
+@pytest.fixture
+def context(shared_context):
+    """One MockContext reused across the module, reset to an active stream for each test."""
+    shared_context.is_active_value = True
+    shared_context.cancelled = False
+    return shared_context
+
+@pytest.fixture(scope="module")
+def hashed_test_password():
+    """Hashes the shared test password once for every test that seeds a user."""
+    return ChatServer().hash_password("TestPassword123")
+
+@pytest.fixture
+def seeded_messages(chat_server):
+    """Seeds testuser's inbox with shallow copies of MESSAGE_TEMPLATE and returns it."""
+    messages = [dict(m) for m in MESSAGE_TEMPLATE]
+    chat_server.messages["testuser"] = messages
+    return messages
+
 def test_hash_password(chat_server):
     """Tests that password hashing works correctly."""
     password = "TestPassword123"
     hashed = chat_server.hash_password(password)
-    # Verify it's a SHA-256 hash (64 hex characters)
-    assert len(hashed) == 64
+    # Verify it's a raw SHA-256 digest (32 bytes)
+    assert len(hashed) == 32
     # Verify it's deterministic
     assert hashed == chat_server.hash_password(password)
 
-def test_validate_password(chat_server):
+def test_verify_password(chat_server, hashed_test_password, monkeypatch):
+    """Tests that passwords are checked against the stored digest in constant time."""
+    # Stored hashes are raw SHA-256 digests of the password
+    assert hmac.compare_digest(hashed_test_password, hashlib.sha256(b"TestPassword123").digest())
+    
+    # Record comparisons to confirm verification goes through hmac.compare_digest
+    compared = []
+    compare_digest = hmac.compare_digest
+    monkeypatch.setattr(hmac, "compare_digest", lambda a, b: compared.append((a, b)) or compare_digest(a, b))
+    
+    assert chat_server.verify_password("TestPassword123", hashed_test_password) is True
+    assert chat_server.verify_password("WrongPassword123", hashed_test_password) is False
+    assert len(compared) == 2
+
+@pytest.mark.parametrize("password,valid", [
+    ("Short1", False),            # Too short
+    ("NoNumberHere", False),      # No number
+    ("nouppercase123", False),    # No uppercase
+    ("ValidPassword123", True),   # Valid password
+])
+def test_validate_password(chat_server, password, valid):
     """Tests password validation rules."""
-    # Too short
-    assert chat_server.validate_password("Short1") is False
-    # No number
-    assert chat_server.validate_password("NoNumberHere") is False
-    # No uppercase
-    assert chat_server.validate_password("nouppercase123") is False
-    # Valid password
-    assert chat_server.validate_password("ValidPassword123") is True
+    assert chat_server.validate_password(password) is valid
 
-def test_create_account(chat_server):
+def test_create_account(chat_server, context):
     """Tests account creation functionality."""
-    context = MockContext()
-    request = chat.CreateAccount(username="testuser", password="TestPassword123")
+    request = REQUESTS["create_testuser"]
     
     # Create a new account
     response = chat_server.SendCreateAccount(request, context)
@@ -87,94 +139,80 @@ def test_create_account(chat_server):
     assert "already exists" in response.message
     
     # Test with invalid password
-    request = chat.CreateAccount(username="newuser", password="weak")
+    request = REQUESTS["create_weak_password"]
     response = chat_server.SendCreateAccount(request, context)
     assert response.error is True
     assert "Password must be" in response.message
 
-def test_login(chat_server):
+def test_login(chat_server, context, hashed_test_password):
     """Tests login functionality."""
-    context = MockContext()
-    
     # Create test account
-    chat_server.users["testuser"] = (chat_server.hash_password("TestPassword123"), {})
+    chat_server.users["testuser"] = (hashed_test_password, {})
     
     # Test successful login
-    request = chat.Login(username="testuser", password="TestPassword123")
+    request = REQUESTS["login_testuser"]
     response = chat_server.SendLogin(request, context)
     assert response.error is False
     assert "testuser" in chat_server.active_users
     
     # Test login with wrong password
-    request = chat.Login(username="testuser", password="WrongPassword123")
+    request = REQUESTS["login_wrong_password"]
     response = chat_server.SendLogin(request, context)
     assert response.error is True
     assert "Invalid password" in response.message
     
     # Test login with non-existent user
-    request = chat.Login(username="nonexistent", password="TestPassword123")
+    request = REQUESTS["login_nonexistent"]
     response = chat_server.SendLogin(request, context)
     assert response.error is True
     assert "User not found" in response.message
 
-def test_logout(chat_server):
+def test_logout(chat_server, context, hashed_test_password):
     """Tests logout functionality."""
-    context = MockContext()
-    
     # Setup: create user and log in
-    chat_server.users["testuser"] = (chat_server.hash_password("TestPassword123"), {})
-    chat_server.active_users["testuser"] = True
+    chat_server.users["testuser"] = (hashed_test_password, {})
+    chat_server.active_users.add("testuser")
     
     # Test successful logout
-    request = chat.Logout(username="testuser")
+    request = REQUESTS["logout_testuser"]
     response = chat_server.SendLogout(request, context)
     assert response.error is False
     assert "testuser" not in chat_server.active_users
     
     # Test logout when not logged in
-    request = chat.Logout(username="testuser")
+    request = REQUESTS["logout_testuser"]
     response = chat_server.SendLogout(request, context)
     assert response.error is True
     assert "Not logged in" in response.message
 
-def test_delete_account(chat_server):
+def test_delete_account(chat_server, context, hashed_test_password):
     """Tests account deletion functionality."""
-    context = MockContext()
-    
     # Setup: create user
-    password = "TestPassword123"
-    hashed_password = chat_server.hash_password(password)
-    chat_server.users["testuser"] = (hashed_password, {})
-    chat_server.active_users["testuser"] = True
+    chat_server.users["testuser"] = (hashed_test_password, {})
+    chat_server.active_users.add("testuser")
     
     # Test with wrong password
-    request = chat.DeleteAccount(username="testuser", password="WrongPassword")
+    request = REQUESTS["delete_account_wrong_password"]
     response = chat_server.SendDeleteAccount(request, context)
     assert response.error is True
     assert "Invalid password" in response.message
     
     # Test successful deletion
-    request = chat.DeleteAccount(username="testuser", password=password)
+    request = REQUESTS["delete_account_testuser"]
     response = chat_server.SendDeleteAccount(request, context)
     assert response.error is False
     assert "testuser" not in chat_server.users
     assert "testuser" not in chat_server.active_users
 
-def test_send_message(chat_server):
+def test_send_message(chat_server, context, hashed_test_password):
     """Tests message sending functionality."""
-    context = MockContext()
-    
     # Setup: create sender and recipient users
-    chat_server.users["sender"] = (chat_server.hash_password("TestPassword123"), {})
-    chat_server.users["recipient"] = (chat_server.hash_password("TestPassword123"), {})
-    chat_server.active_users["sender"] = True
+    chat_server.users["sender"] = (hashed_test_password, {})
+    chat_server.users["recipient"] = (hashed_test_password, {})
+    chat_server.active_users.add("sender")
     
     # Test successful message sending
-    request = chat.Message(
-        username="sender", 
-        to="recipient", 
-        content="Hello, world!"
-    )
+    request = REQUESTS["message_to_recipient"]
     
     response = chat_server.SendMessage(request, context)
     assert response.error is False
@@ -184,158 +222,118 @@ def test_send_message(chat_server):
     assert chat_server.messages["recipient"][0]["read"] is False
     
     # Test sending message when not logged in
-    del chat_server.active_users["sender"]
+    chat_server.active_users.discard("sender")
     response = chat_server.SendMessage(request, context)
     assert response.error is True
     assert "Not logged in" in response.message
     
     # Test sending message to non-existent recipient
-    chat_server.active_users["sender"] = True
-    request = chat.Message(username="sender", to="nonexistent", content="Hello")
+    chat_server.active_users.add("sender")
+    request = REQUESTS["message_to_nonexistent"]
     response = chat_server.SendMessage(request, context)
     assert response.error is True
     assert "Recipient not found" in response.message
 
-def test_chat_stream(chat_server):
+@pytest.mark.parametrize("n_msgs", [1, 10, 100])
+def test_chat_stream(chat_server, context, hashed_test_password, monkeypatch, n_msgs):
     """Tests the chat stream functionality."""
-    context = MockContext()
-    
     # Setup: Create users and messages
-    chat_server.users["testuser"] = (chat_server.hash_password("TestPassword123"), {})
-    chat_server.active_users["testuser"] = True
+    chat_server.users["testuser"] = (hashed_test_password, {})
+    chat_server.active_users.add("testuser")
     
     # Add unread messages for the user
     chat_server.messages["testuser"] = [
         {
-            "id": 1,
+            "id": i,
             "from": "sender",
             "to": "testuser",
-            "content": "Hello",
+            "content": f"Hello {i}",
             "timestamp": time.time(),
             "read": False,
             "delivered_while_offline": True
         }
+        for i in range(1, n_msgs + 1)
     ]
     
     # Create a request iterator with the username
-    requests = [chat.Id(username="testuser")]
-    request_iterator = MockRequestIterator(requests)
+    requests = [REQUESTS["stream_id_testuser"]]
+    request_iterator = iter(requests)
     
     # Mock notifying users
     chat_server.notify_user_async = MagicMock()
+    # Count poll passes instead of sleeping through them
+    sleep = MagicMock()
+    monkeypatch.setattr(time, "sleep", sleep)
     
     # Call ChatStream and get the generator
     stream_generator = chat_server.ChatStream(request_iterator, context)
     
-    # Process a limited number of messages from the generator
-    # We don't want to run an infinite loop, so we'll limit it
-    messages = []
-    try:
-        # Use next() to get the first message or raise StopIteration
-        message = next(stream_generator)
-        messages.append(message)
-    except StopIteration:
-        pass
-    
-    # Check that we got messages from the stream
-    assert len(messages) == 1
-    assert messages[0].content == "Hello"
+    # The stream never ends on its own, so take exactly the seeded messages
+    messages = list(itertools.islice(stream_generator, n_msgs))
+    stream_generator.close()
+    
+    # Check that every pending message went out in a single poll pass
+    assert sleep.call_count == 1
+    assert [m.id for m in messages] == list(range(1, n_msgs + 1))
+    assert messages[0].content == "Hello 1"
     assert messages[0].username == "sender"
     assert messages[0].to == "testuser"
 
-def test_get_messages(chat_server):
+def test_get_messages(chat_server, context, hashed_test_password, seeded_messages):
     """Tests retrieving read messages for a user."""
-    context = MockContext()
-    
-    # Setup: create user and add messages
-    chat_server.users["testuser"] = (chat_server.hash_password("TestPassword123"), {})
-    chat_server.active_users["testuser"] = True
-    
-    chat_server.messages["testuser"] = [
-        {"id": 1, "from": "sender", "to": "testuser", "content": "Hello", 
-         "timestamp": 1, "read": True, "delivered_while_offline": False},
-        {"id": 2, "from": "sender", "to": "testuser", "content": "World", 
-         "timestamp": 2, "read": True, "delivered_while_offline": False},
-        {"id": 3, "from": "sender", "to": "testuser", "content": "Unread", 
-         "timestamp": 3, "read": False, "delivered_while_offline": False}
-    ]
+    # Setup: create user; seeded_messages fills the inbox
+    chat_server.users["testuser"] = (hashed_test_password, {})
+    chat_server.active_users.add("testuser")
     
     # Test getting messages
-    request = chat.GetMessages(username="testuser", count=10)
+    request = REQUESTS["get_messages_10"]
     response = chat_server.SendGetMessages(request, context)
     
     assert response.error is False
     assert len(response.messages) == 2  # Only read messages
     
     # Check most recent message is first
-    assert response.messages[0].content == "World"
-    assert response.messages[0].id == 2
-    assert response.messages[1].content == "Hello"
-    assert response.messages[1].id == 1
+    assert [(m.id, m.content) for m in response.messages] == [(2, "Message2"), (1, "Message1")]
     
     # Test when not logged in
-    del chat_server.active_users["testuser"]
+    chat_server.active_users.discard("testuser")
     response = chat_server.SendGetMessages(request, context)
     assert response.error is True
 
-def test_get_undelivered_messages(chat_server):
+def test_get_undelivered_messages(chat_server, context, hashed_test_password, seeded_messages):
     """Tests retrieving unread messages for a user."""
-    context = MockContext()
-    
-    # Setup: create user and add messages
-    chat_server.users["testuser"] = (chat_server.hash_password("TestPassword123"), {})
-    chat_server.active_users["testuser"] = True
-    
-    chat_server.messages["testuser"] = [
-        {"id": 1, "from": "sender", "to": "testuser", "content": "Read", 
-         "timestamp": 1, "read": True, "delivered_while_offline": False},
-        {"id": 2, "from": "sender", "to": "testuser", "content": "Unread1", 
-         "timestamp": 2, "read": False, "delivered_while_offline": True},
-        {"id": 3, "from": "sender", "to": "testuser", "content": "Unread2", 
-         "timestamp": 3, "read": False, "delivered_while_offline": False}
-    ]
+    # Setup: create user; message 2 arrived while testuser was offline
+    chat_server.users["testuser"] = (hashed_test_password, {})
+    chat_server.active_users.add("testuser")
+    seeded_messages[1].update(read=False, delivered_while_offline=True)
     
     # Test getting unread messages
-    request = chat.GetUndelivered(username="testuser", count=10)
+    request = REQUESTS["get_undelivered_10"]
     response = chat_server.SendGetUndelivered(request, context)
     
     assert response.error is False
     assert len(response.messages) == 2  # Only unread messages
     
     # Check messages are sorted by timestamp (newest first)
-    assert response.messages[0].content == "Unread2"
-    assert response.messages[0].id == 3
-    assert response.messages[1].content == "Unread1"
-    assert response.messages[1].id == 2
+    assert [(m.id, m.content) for m in response.messages] == [(3, "Message3"), (2, "Message2")]
     
     # Verify messages are marked as read
     assert chat_server.messages["testuser"][1]["read"] is True
     assert chat_server.messages["testuser"][2]["read"] is True
     
     # Test when not logged in
-    del chat_server.active_users["testuser"]
+    chat_server.active_users.discard("testuser")
     response = chat_server.SendGetUndelivered(request, context)
     assert response.error is True
 
-def test_delete_messages(chat_server):
+def test_delete_messages(chat_server, context, hashed_test_password, seeded_messages):
     """Tests deleting messages."""
-    context = MockContext()
-    
-    # Setup: create user and add messages
-    chat_server.users["testuser"] = (chat_server.hash_password("TestPassword123"), {})
-    chat_server.active_users["testuser"] = True
-    
-    chat_server.messages["testuser"] = [
-        {"id": 1, "from": "sender", "to": "testuser", "content": "Message1", 
-         "timestamp": 1, "read": True, "delivered_while_offline": False},
-        {"id": 2, "from": "sender", "to": "testuser", "content": "Message2", 
-         "timestamp": 2, "read": True, "delivered_while_offline": False},
-        {"id": 3, "from": "sender", "to": "testuser", "content": "Message3", 
-         "timestamp": 3, "read": False, "delivered_while_offline": False}
-    ]
+    # Setup: create user; seeded_messages fills the inbox
+    chat_server.users["testuser"] = (hashed_test_password, {})
+    chat_server.active_users.add("testuser")
     
     # Test deleting messages
-    request = chat.DeleteMessages(username="testuser", message_ids=[1, 3])
+    request = REQUESTS["delete_messages_1_3"]
     response = chat_server.SendDeleteMessages(request, context)
     
     assert response.error is False
@@ -343,26 +341,24 @@ def test_delete_messages(chat_server):
     assert chat_server.messages["testuser"][0]["id"] == 2
     
     # Test when not logged in
-    del chat_server.active_users["testuser"]
-    request = chat.DeleteMessages(username="testuser", message_ids=[2])
+    chat_server.active_users.discard("testuser")
+    request = REQUESTS["delete_messages_2"]
     response = chat_server.SendDeleteMessages(request, context)
     assert response.error is True
 
-def test_list_accounts(chat_server):
+def test_list_accounts(chat_server, context, hashed_test_password):
     """Tests listing user accounts."""
-    context = MockContext()
-    
     # Setup: create users
     chat_server.users = {
-        "user1": (chat_server.hash_password("TestPassword123"), {}),
-        "user2": (chat_server.hash_password("TestPassword123"), {}),
-        "admin": (chat_server.hash_password("TestPassword123"), {}),
-        "tester": (chat_server.hash_password("TestPassword123"), {})
+        "user1": (hashed_test_password, {}),
+        "user2": (hashed_test_password, {}),
+        "admin": (hashed_test_password, {}),
+        "tester": (hashed_test_password, {})
     }
-    chat_server.active_users["user1"] = True
+    chat_server.active_users.add("user1")
     
     # Test listing all users
-    request = chat.ListAccounts(username="user1", wildcard="*")
+    request = REQUESTS["list_all"]
     response = chat_server.SendListAccounts(request, context)
     
     assert response.error is False
@@ -374,12 +370,19 @@ def test_list_accounts(chat_server):
     assert user_statuses["user2"] == "offline"
     
     # Test with wildcard pattern
-    request = chat.ListAccounts(username="user1", wildcard="user*")
+    request = REQUESTS["list_user_prefix"]
     response = chat_server.SendListAccounts(request, context)
     
     assert response.error is False
     assert len(response.users) == 2
     assert all(user.username.startswith("user") for user in response.users)
+    
+    # Repeating a search reuses the compiled pattern instead of translating it again
+    glob_matcher.cache_clear()
+    chat_server.SendListAccounts(request, context)
+    chat_server.SendListAccounts(request, context)
+    assert glob_matcher.cache_info().currsize == 1
+    assert glob_matcher.cache_info().hits == 1
 
 def test_get_unread_count(chat_server):
     """Tests unread message count retrieval."""
@@ -392,24 +395,20 @@ def test_get_unread_count(chat_server):
 
 def test_serve():
     """Tests that the server can start and stop."""
-    with patch('grpc.server') as mock_server, \
-         patch('grpc.insecure_channel') as mock_channel:
+    # serve() records the bound port in the config; keep it off the real chat_config.json
+    with patch('grpc.server') as mock_server, patch('grpc_server.Config') as mock_config:
         
-        # Mock the server and its methods
+        # Mock the server and its methods; wait_for_termination returns at once
         mock_server_instance = mock_server.return_value
         mock_server_instance.add_insecure_port.return_value = 12345
         
-        # Start server in a thread so we can stop it
-        server_thread = threading.Thread(target=serve, args=('localhost', 50051))
-        server_thread.daemon = True
-        server_thread.start()
+        # serve() blocks in wait_for_termination, so it returns as soon as that does
+        serve('localhost', 50051)
         
-        # Allow the server to start
-        time.sleep(0.1)
-        
-        # Verify server was started
+        # Verify server was started, waited on, and stopped
         assert mock_server.called
-        assert mock_server_instance.start.called
-        
-        # Stop the thread
-        server_thread.join(timeout=0.5)
\ No newline at end of file
+        mock_server_instance.add_insecure_port.assert_called_once_with("localhost:50051")
+        mock_server_instance.start.assert_called_once()
+        mock_server_instance.wait_for_termination.assert_called_once()
+        mock_server_instance.stop.assert_called_once_with(0)
+        mock_config.return_value.update.assert_called_once_with("port", 50051)
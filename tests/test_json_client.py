@@ -4,18 +4,35 @@ import json
 import sys
 import tkinter as tk
 from tkinter import messagebox
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock, Mock, patch
 
 sys.path.insert(0, "src/json_protocol")
+import json_client
 from json_client import ChatClient
 
+@pytest.fixture(scope="module", autouse=True)
+def _patch_tk():
+    """Builds the client's window and widgets from mocks, so no display is needed."""
+    # monkeypatch is function-scoped, so open a module-lifetime context instead
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(json_client, "tk", MagicMock())
+        mp.setattr(json_client, "ttk", MagicMock())
+        yield
+
+@pytest.fixture(scope="module", autouse=True)
+def _patch_socket():
+    """Keeps every test in this module off real sockets."""
+    with patch('socket.socket') as mock_socket:
+        # Each client's receive thread sees EOF at once instead of reading MagicMocks
+        mock_socket.return_value.recv_into.return_value = 0
+        yield mock_socket
+
 @pytest.fixture
 def chat_client():
     """Fixture to create a ChatClient instance with a mocked socket."""
-    with patch('socket.socket') as mock_socket:
-        client = ChatClient("127.0.0.1", 12345)
-        client.socket = MagicMock()
-        yield client
+    client = ChatClient("127.0.0.1", 12345)
+    client.socket = MagicMock()
+    return client
 
 def test_chat_client_initialization(chat_client):
     """Test the initialization of the ChatClient class."""
@@ -27,38 +44,28 @@ def test_chat_client_initialization(chat_client):
 def test_setup_gui(chat_client):
     """Test the setup_gui method."""
     chat_client.setup_gui()
-    assert hasattr(chat_client, 'notebook')
-    assert hasattr(chat_client, 'auth_frame')
-    assert hasattr(chat_client, 'chat_frame')
-    assert hasattr(chat_client, 'accounts_frame')
+    assert {'notebook', 'auth_frame', 'chat_frame', 'accounts_frame'} <= vars(chat_client).keys()
 
 def test_setup_auth_frame(chat_client):
     """Test the setup_auth_frame method."""
     chat_client.setup_auth_frame()
-    assert hasattr(chat_client, 'username_entry')
-    assert hasattr(chat_client, 'password_entry')
+    assert {'username_entry', 'password_entry'} <= vars(chat_client).keys()
 
 def test_setup_chat_frame(chat_client):
     """Test the setup_chat_frame method."""
     chat_client.setup_chat_frame()
-    assert hasattr(chat_client, 'messages_canvas')
-    assert hasattr(chat_client, 'messages_frame')
-    assert hasattr(chat_client, 'msg_count')
+    assert {'messages_canvas', 'messages_frame', 'msg_count'} <= vars(chat_client).keys()
 
 def test_setup_accounts_frame(chat_client):
     """Test the setup_accounts_frame method."""
     chat_client.setup_accounts_frame()
-    assert hasattr(chat_client, 'accounts_list')
-    assert hasattr(chat_client, 'search_var')
-    assert hasattr(chat_client, 'recipient_var')
+    assert {'accounts_list', 'search_var', 'recipient_var'} <= vars(chat_client).keys()
 
 def test_create_account(chat_client):
     """Test the create_account method."""
-    chat_client.username_entry = MagicMock()
-    chat_client.username_entry.get.return_value = "testuser"
-    chat_client.password_entry = MagicMock()
-    chat_client.password_entry.get.return_value = "testpass"
-    chat_client.send_command = MagicMock()
+    chat_client.username_entry = Mock(get=Mock(return_value="testuser"))
+    chat_client.password_entry = Mock(get=Mock(return_value="testpass"))
+    chat_client.send_command = Mock()
     chat_client.create_account()
     chat_client.send_command.assert_called_with({
         "cmd": "create",
@@ -68,11 +75,9 @@ def test_create_account(chat_client):
 
 def test_login(chat_client):
     """Test the login method."""
-    chat_client.username_entry = MagicMock()
-    chat_client.username_entry.get.return_value = "testuser"
-    chat_client.password_entry = MagicMock()
-    chat_client.password_entry.get.return_value = "testpass"
-    chat_client.send_command = MagicMock()
+    chat_client.username_entry = Mock(get=Mock(return_value="testuser"))
+    chat_client.password_entry = Mock(get=Mock(return_value="testpass"))
+    chat_client.send_command = Mock()
     chat_client.login()
     chat_client.send_command.assert_called_with({
         "cmd": "login",
@@ -83,11 +88,9 @@ def test_login(chat_client):
 def test_send_message(chat_client):
     """Test the send_message method."""
     chat_client.username = "testuser"
-    chat_client.recipient_var = MagicMock()
-    chat_client.recipient_var.get.return_value = "recipient"
-    chat_client.message_text = MagicMock()
-    chat_client.message_text.get.return_value = "Hello"
-    chat_client.send_command = MagicMock()
+    chat_client.recipient_var = Mock(get=Mock(return_value="recipient"))
+    chat_client.message_text = Mock(get=Mock(return_value="Hello"))
+    chat_client.send_command = Mock()
     chat_client.send_message()
     chat_client.send_command.assert_called_with({
         "cmd": "send",
@@ -97,7 +100,7 @@ def test_send_message(chat_client):
 
 def test_delete_message(chat_client):
     """Test the delete_message method."""
-    chat_client.send_command = MagicMock()
+    chat_client.send_command = Mock()
     chat_client.messages_frame = MagicMock()
     chat_client.messages_frame.winfo_children.return_value = [MagicMock()]
     with patch('tkinter.messagebox.askyesno', return_value=True):
@@ -110,9 +113,8 @@ def test_delete_message(chat_client):
 
 def test_refresh_messages(chat_client):
     """Test the refresh_messages method."""
-    chat_client.msg_count = MagicMock()
-    chat_client.msg_count.get.return_value = "10"
-    chat_client.send_command = MagicMock()
+    chat_client.msg_count = Mock(get=Mock(return_value="10"))
+    chat_client.send_command = Mock()
     chat_client.refresh_messages()
     chat_client.send_command.assert_called_with({
         "cmd": "get_messages",
@@ -121,9 +123,8 @@ def test_refresh_messages(chat_client):
 
 def test_refresh_unread_messages(chat_client):
     """Test the refresh_unread_messages method."""
-    chat_client.msg_count = MagicMock()
-    chat_client.msg_count.get.return_value = "10"
-    chat_client.send_command = MagicMock()
+    chat_client.msg_count = Mock(get=Mock(return_value="10"))
+    chat_client.send_command = Mock()
     chat_client.refresh_unread_messages()
     chat_client.send_command.assert_called_with({
         "cmd": "get_undelivered",
@@ -132,9 +133,8 @@ def test_refresh_unread_messages(chat_client):
 
 def test_search_accounts(chat_client):
     """Test the search_accounts method."""
-    chat_client.search_var = MagicMock()
-    chat_client.search_var.get.return_value = "test"
-    chat_client.send_command = MagicMock()
+    chat_client.search_var = Mock(get=Mock(return_value="test"))
+    chat_client.send_command = Mock()
     chat_client.search_accounts()
     chat_client.send_command.assert_called_with({
         "cmd": "list",
@@ -144,9 +144,8 @@ def test_search_accounts(chat_client):
 def test_delete_account(chat_client):
     """Test the delete_account method."""
     chat_client.username = "testuser"
-    chat_client.delete_password = MagicMock()
-    chat_client.delete_password.get.return_value = "testpass"
-    chat_client.send_command = MagicMock()
+    chat_client.delete_password = Mock(get=Mock(return_value="testpass"))
+    chat_client.send_command = Mock()
     with patch('tkinter.messagebox.askyesno', return_value=True):
         chat_client.delete_account()
     chat_client.send_command.assert_called_with({
@@ -157,13 +156,57 @@ def test_delete_account(chat_client):
 def test_logout(chat_client):
     """Test the logout method."""
     chat_client.username = "testuser"
-    chat_client.send_command = MagicMock()
+    chat_client.send_command = Mock()
     chat_client.logout()
     chat_client.send_command.assert_called_with({"cmd": "logout"})
 
 def test_run(chat_client):
     """Test the run method."""
     chat_client.root = MagicMock()
+    chat_client.search_var = Mock(get=Mock(return_value=""))
     chat_client.run()
     chat_client.root.after.assert_called()
-    chat_client.root.mainloop.assert_called_once()
\ No newline at end of file
+    chat_client.root.mainloop.assert_called_once()
+
+
+def test_user_list_updates_coalesce(chat_client):
+    """Test that a burst of user lists redraws the accounts list once, with the newest."""
+    chat_client.root = MagicMock()
+    chat_client.accounts_list = MagicMock()
+    chat_client.handle_message({"success": True, "users": [{"username": "a", "status": "online"}]})
+    chat_client.handle_message({"success": True, "users": [{"username": "b", "status": "offline"}]})
+    chat_client.root.after_idle.assert_called_once_with(chat_client.update_accounts_list)
+
+    chat_client.update_accounts_list()
+    chat_client.accounts_list.insert.assert_called_once_with("", "end", iid="b", values=("b", "offline"))
+    assert chat_client.pending_users is None
+
+def test_update_accounts_list_diffs_rows(chat_client):
+    """Test that redraws only insert, update or delete the rows that changed."""
+    chat_client.accounts_list = MagicMock()
+    chat_client.account_rows = {"a": ("a", "online"), "b": ("b", "online"), "c": ("c", "offline")}
+    chat_client.pending_users = [
+        {"username": "a", "status": "online"},
+        {"username": "b", "status": "offline"},
+        {"username": "d", "status": "online"},
+    ]
+    chat_client.update_accounts_list()
+
+    chat_client.accounts_list.delete.assert_called_once_with("c")
+    chat_client.accounts_list.item.assert_called_once_with("b", values=("b", "offline"))
+    chat_client.accounts_list.insert.assert_called_once_with("", "end", iid="d", values=("d", "online"))
+
+def test_search_debounce(chat_client):
+    """Test that a burst of keystrokes schedules a single search."""
+    chat_client.root = MagicMock()
+    chat_client.root.after.side_effect = ["after#1", "after#2"]
+    chat_client.on_search_changed()
+    chat_client.on_search_changed()
+    chat_client.root.after_cancel.assert_called_once_with("after#1")
+    assert chat_client.root.after.call_count == 2
+
+    chat_client.search_var = Mock(get=Mock(return_value="test"))
+    chat_client.send_command = Mock()
+    chat_client.run_pending_search()
+    assert chat_client.search_after is None
+    chat_client.send_command.assert_called_once_with({"cmd": "list", "pattern": "test*"})
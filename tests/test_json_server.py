@@ -5,7 +5,6 @@ import threading
 import os
 import sys
 import hashlib
-import time
 
 sys.path.insert(0, "src/json_protocol")
 
@@ -40,6 +39,14 @@ class MockSocket:
             raise ConnectionError("Socket is closed")
         self.sent_data.append(data)
 
+    def sendall(self, data):
+        """Simulates sending a whole buffer over a socket.
+
+        Args:
+            data (bytes): Data to send.
+        """
+        self.send(data)
+
     def recv(self, buffer_size):
         """Simulates receiving data from a socket.
 
@@ -53,6 +60,19 @@ class MockSocket:
             return b""
         return self.received_data.pop(0) if self.received_data else b""
 
+    def recv_into(self, buffer):
+        """Simulates receiving data into a caller-supplied buffer.
+
+        Args:
+            buffer (bytearray): Buffer to fill with received data.
+
+        Returns:
+            int: Number of bytes written, 0 if none.
+        """
+        data = self.recv(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
     def close(self):
         """Simulates closing a socket."""
         self.is_closed = True
@@ -89,6 +109,29 @@ class MockSocket:
         """
         return MockSocket(), ("127.0.0.1", 54321)
 
+    def getsockname(self):
+        """Simulates reading the bound address, with a fixed port for port 0.
+
+        Returns:
+            tuple: The (host, port) pair the socket is bound to.
+        """
+        host, port = self.bound_address
+        return host, port or 54321
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def new_mock_socket(*args, **kwargs):
+    """Stands in for `socket.socket`, returning a fresh MockSocket per call.
+
+    Returns:
+        MockSocket: A socket whose bind/listen/setsockopt are already no-ops.
+    """
+    return MockSocket()
+
 @pytest.fixture
 def chat_server():
     """Fixture to create a ChatServer instance.
@@ -122,26 +165,18 @@ def test_handle_client(chat_server, monkeypatch):
 
 def test_start(chat_server, monkeypatch):
     """Tests that ChatServer starts and can be stopped properly."""
-    
-    def mock_socket(*args, **kwargs):
-        """Mocked socket to prevent real network operations."""
-        mock = MockSocket()
-        mock.setsockopt = lambda *args: None
-        mock.bind = lambda *args: None
-        mock.listen = lambda backlog: None
-        return mock
-
-    monkeypatch.setattr(socket, "socket", mock_socket)
+    monkeypatch.setattr(socket, "socket", new_mock_socket)
 
     server_thread = threading.Thread(target=chat_server.start, daemon=True)
     server_thread.start()
-    time.sleep(1)
+    assert chat_server.ready.wait(timeout=2)
 
     assert chat_server.running is True
 
     chat_server.stop()
-    server_thread.join(timeout=1)
+    assert chat_server.stopped.wait(timeout=2)
     assert chat_server.running is False
+    server_thread.join(timeout=1)
 
 def test_stop(chat_server):
     """Tests stopping the chat server."""
@@ -220,14 +255,15 @@ def test_server_start_listen(chat_server, monkeypatch):
 
     server_thread = threading.Thread(target=chat_server.start, daemon=True)
     server_thread.start()
-    time.sleep(1)
+    assert chat_server.ready.wait(timeout=2)
 
     assert chat_server.running is True
     assert mock_socket.is_listening is True  # Ensure server is actually listening
 
     chat_server.stop()
-    server_thread.join(timeout=1)
+    assert chat_server.stopped.wait(timeout=2)
     assert chat_server.running is False
+    server_thread.join(timeout=1)
 
 def test_send_message_invalid_user(chat_server):
     """Test sending a message to a non-existent user."""
@@ -247,17 +283,21 @@ def test_send_message_invalid_user(chat_server):
 
 def test_find_free_port(chat_server, monkeypatch):
     """Tests finding an available port for the server."""
-    
-    def mock_socket(*args, **kwargs):
-        mock = MockSocket()
-        mock.setsockopt = lambda *args: None
-        mock.bind = lambda *args: None
-        return mock
-
-    monkeypatch.setattr(socket, "socket", mock_socket)
+    monkeypatch.setattr(socket, "socket", new_mock_socket)
     port = chat_server.find_free_port(12345)
     assert isinstance(port, int)
 
+def test_find_free_port_in_use(chat_server):
+    """Tests probing upward from the preferred port when it is taken."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as taken:
+        taken.bind(("127.0.0.1", 0))
+        taken.listen(1)
+        busy_port = taken.getsockname()[1]
+
+        port = chat_server.find_free_port(busy_port)
+        assert port > busy_port
+        assert 1024 <= port <= 65535
+
 def test_broadcast_user_list(chat_server):
     """Tests broadcasting the updated user list."""
     chat_server.users = {"user1": ("hash1", {}), "user2": ("hash2", {})}
@@ -4,10 +4,19 @@ from tkinter import ttk
 import time
 import sys
 import os
+from types import SimpleNamespace
+from unittest.mock import MagicMock
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import src.utils as utils
 from src.utils import MessageFrame
 
+# Tests that open real Tk windows need an X display on Linux
+requires_display = pytest.mark.skipif(
+    sys.platform.startswith("linux") and not os.environ.get("DISPLAY"),
+    reason="Tk tests require a display",
+)
+
 @pytest.fixture(scope="function")
 def root():
     root = tk.Tk()
@@ -23,12 +32,14 @@ def message_data():
         "timestamp": time.time()
     }
 
+@requires_display
 def test_message_frame_creation(root, message_data):
     frame = MessageFrame(root, message_data)
     assert frame.message_id == message_data["id"]
     assert isinstance(frame.select_var, tk.BooleanVar)
     assert not frame.select_var.get()
 
+@requires_display
 def test_message_frame_content(root, message_data):
     frame = MessageFrame(root, message_data)
     labels = [widget for widget in frame.winfo_children() 
@@ -40,6 +51,7 @@ def test_message_frame_content(root, message_data):
     assert any(message_data["from"] in label.winfo_children()[1].cget("text") 
               for label in labels if isinstance(label, ttk.Frame))
 
+@requires_display
 def test_message_frame_timestamp_format(root, message_data):
     frame = MessageFrame(root, message_data)
     header_frame = frame.winfo_children()[0]
@@ -49,6 +61,7 @@ def test_message_frame_timestamp_format(root, message_data):
                                 time.localtime(message_data["timestamp"]))
     assert expected_time in sender_label.cget("text")
 
+@requires_display
 def test_message_frame_checkbox(root, message_data):
     frame = MessageFrame(root, message_data)
     header_frame = frame.winfo_children()[0]
@@ -58,8 +71,35 @@ def test_message_frame_checkbox(root, message_data):
     frame.select_var.set(True)
     assert frame.select_var.get()
 
+@requires_display
 def test_message_frame_wrap_length(root, message_data):
     frame = MessageFrame(root, message_data)
     content_label = [widget for widget in frame.winfo_children() 
                     if isinstance(widget, ttk.Label)][0]
-    assert content_label.cget("wraplength") == 400
\ No newline at end of file
+    assert content_label.cget("wraplength") == 400
+
+@pytest.fixture
+def widgets(monkeypatch):
+    """Builds MessageFrame from mock widgets, so these tests need no display.
+
+    Returns the mocked `tk` and `ttk` modules the frame creates its children from.
+    """
+    monkeypatch.setattr(ttk.Frame, "__init__", MagicMock(return_value=None))
+    monkeypatch.setattr(MessageFrame, "configure", MagicMock())
+    mocks = SimpleNamespace(tk=MagicMock(), ttk=MagicMock())
+    monkeypatch.setattr(utils, "tk", mocks.tk)
+    monkeypatch.setattr(utils, "ttk", mocks.ttk)
+    return mocks
+
+def test_message_frame_widgets_headless(widgets, message_data):
+    frame = MessageFrame(MagicMock(), message_data)
+    header_frame = widgets.ttk.Frame.return_value
+    sender, content = [call.kwargs for call in widgets.ttk.Label.call_args_list]
+    
+    assert frame.message_id == message_data["id"]
+    widgets.ttk.Checkbutton.assert_called_once_with(header_frame, variable=frame.select_var)
+    expected_time = time.strftime('%Y-%m-%d %H:%M:%S', 
+                                time.localtime(message_data["timestamp"]))
+    assert sender["text"] == f"From: {message_data['from']} at {expected_time}"
+    assert content["text"] == message_data["content"]
+    assert content["wraplength"] == 400